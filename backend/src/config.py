@@ -27,6 +27,9 @@ CLAUDE_MODEL = "anthropic/claude-opus-4.6"
 GEMINI_MODEL = "google/gemini-3.1-pro-preview"
 GEMINI_IMAGE_MODEL = "google/gemini-3-pro-image-preview"
 
+# Max in-flight Gemini calls per process (keeps zone fan-out under rate limits)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "6"))
+
 # --- fal.ai Models ---
 TRELLIS_MODEL = "fal-ai/trellis-2"
 TRELLIS_MULTI_MODEL = "fal-ai/trellis-2/multi"
@@ -1,5 +1,6 @@
 """Supabase client and CRUD helpers for all tables."""
 
+import time
 import uuid
 from datetime import UTC, datetime
 
@@ -12,6 +13,10 @@ _client: Client | None = None
 # In-memory storage for voice-intake sessions (swappable with Supabase later)
 _voice_intake_sessions: dict[str, dict] = {}
 
+# In-memory zone decomposition cache: key -> (expires_at, decomposition dict)
+ZONE_CACHE_MAX = 128
+_zone_cache: dict[str, tuple[float, dict]] = {}
+
 
 def get_client() -> Client:
     global _client
@@ -69,6 +74,34 @@ def save_voice_intake_session(session: dict) -> None:
     _voice_intake_sessions[session["session_id"]] = session
 
 
+# ---------------------------------------------------------------------------
+# Zone decomposition cache (in-memory with TTL for now)
+# ---------------------------------------------------------------------------
+
+
+def get_zone_cache(key: str) -> dict | None:
+    """Get a cached zone decomposition, or None if missing or expired."""
+    entry = _zone_cache.get(key)
+    if entry is None:
+        return None
+    expires_at, data = entry
+    if time.monotonic() >= expires_at:
+        _zone_cache.pop(key, None)
+        return None
+    return data
+
+
+def set_zone_cache(key: str, data: dict, ttl_s: float) -> None:
+    """Cache a zone decomposition for ttl_s seconds, evicting expired and oldest entries."""
+    now = time.monotonic()
+    for k in [k for k, (expires_at, _) in _zone_cache.items() if expires_at <= now]:
+        del _zone_cache[k]
+    _zone_cache.pop(key, None)  # re-insert so insertion order tracks recency
+    _zone_cache[key] = (now + ttl_s, data)
+    while len(_zone_cache) > ZONE_CACHE_MAX:
+        del _zone_cache[next(iter(_zone_cache))]
+
+
 # ---------------------------------------------------------------------------
 # design_sessions
 # ---------------------------------------------------------------------------
@@ -157,6 +190,12 @@ def upsert_furniture(item: dict) -> dict:
     return get_client().table("furniture_items").upsert(item).execute().data[0]
 
 
+def upsert_furniture_many(items: list[dict]) -> list[dict]:
+    if not items:
+        return []
+    return get_client().table("furniture_items").upsert(items).execute().data
+
+
 def list_furniture(session_id: str, *, selected_only: bool = False) -> list[dict]:
     q = get_client().table("furniture_items").select("*").eq("session_id", session_id)
     if selected_only:
@@ -1,5 +1,6 @@
 from .grid_types import FloorPlanGrid, DoorInfo, WindowInfo, RoomPolygon
 from .optimizer import FurniturePlacementModel, FurnitureSpec, PlacedFurniture
+from .opt_cache import OptimizationCache
 
 __all__ = [
     "FloorPlanGrid",
@@ -9,4 +10,5 @@ __all__ = [
     "FurniturePlacementModel",
     "FurnitureSpec",
     "PlacedFurniture",
+    "OptimizationCache",
 ]
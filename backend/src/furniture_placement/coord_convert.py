@@ -15,6 +15,7 @@ Frontend 3D system (React Three Fiber):
 """
 
 import logging
+from collections.abc import Iterator
 
 from .grid_types import FloorPlanGrid
 from .optimizer import PlacedFurniture
@@ -26,6 +27,19 @@ logger = logging.getLogger(__name__)
 # prevents clipping with wall meshes whose thickness extends inward.
 DEFAULT_WALL_MARGIN_M = 0.25
 
+# Orientation: (sigma, mu) → rotation_y_degrees
+# (0, 0) = East  → 90°
+# (0, 1) = West  → 270°
+# (1, 0) = South → 180°
+# (1, 1) = North → 0°
+_ORIENTATION_TO_ROTATION = {
+    (0, 0): 90.0,   # East
+    (0, 1): 270.0,  # West
+    (1, 0): 180.0,  # South
+    (1, 1): 0.0,    # North
+}
+_ROTATION_TO_ORIENTATION = {r: o for o, r in _ORIENTATION_TO_ROTATION.items()}
+
 
 def _clamp_to_room_interior(
     x: float,
@@ -92,6 +106,7 @@ def grid_to_3d(
         "position": {"x": float, "y": float, "z": float},
         "rotation_y_degrees": float,
         "size_m": {"width": float, "depth": float, "height": float},
+        "grid": {"i": int, "j": int, "sigma": int, "mu": int},
     }
     """
     cell = grid.cell_size
@@ -112,18 +127,7 @@ def grid_to_3d(
     z = (grid_h * cell) - center_i_m
     y = 0.0  # floor level
 
-    # Orientation: (sigma, mu) → rotation_y_degrees
-    # (0, 0) = East  → 90°
-    # (0, 1) = West  → 270°
-    # (1, 0) = South → 180°
-    # (1, 1) = North → 0°
-    orientation_map = {
-        (0, 0): 90.0,   # East
-        (0, 1): 270.0,  # West
-        (1, 0): 180.0,  # South
-        (1, 1): 0.0,    # North
-    }
-    rotation = orientation_map.get((placement.sigma, placement.mu), 0.0)
+    rotation = _ORIENTATION_TO_ROTATION.get((placement.sigma, placement.mu), 0.0)
 
     # Size in metres (j-axis = width, i-axis = depth in 3D)
     width_m = placement.size_j * cell
@@ -142,6 +146,13 @@ def grid_to_3d(
         "position": {"x": x, "y": y, "z": z},
         "rotation_y_degrees": rotation,
         "size_m": {"width": width_m, "depth": depth_m, "height": height_m},
+        # Unclamped solver cell, so a later run can warm-start from it
+        "grid": {
+            "i": placement.grid_i,
+            "j": placement.grid_j,
+            "sigma": placement.sigma,
+            "mu": placement.mu,
+        },
     }
 
 
@@ -149,6 +160,43 @@ def convert_all_placements(
     placements: list[PlacedFurniture],
     grid: FloorPlanGrid,
     wall_margin: float = DEFAULT_WALL_MARGIN_M,
-) -> list[dict]:
-    """Convert all placements to 3D coordinates."""
-    return [grid_to_3d(p, grid, wall_margin) for p in placements]
+) -> Iterator[dict]:
+    """Convert all placements to 3D coordinates, yielding one dict per placement."""
+    for p in placements:
+        yield grid_to_3d(p, grid, wall_margin)
+
+
+def grid_from_3d(coord: dict, grid: FloorPlanGrid) -> PlacedFurniture | None:
+    """Inverse of grid_to_3d, e.g. to warm-start the optimizer from a saved result.
+
+    Uses the recorded "grid" cell when present. Older results only carry the
+    3D position, where the wall-margin push is not undone, so the recovered
+    cell may be off by one. Returns None if the dict lacks the needed fields.
+    """
+    try:
+        size = coord["size_m"]
+        cell = grid.cell_size
+        size_i = max(1, round(size["depth"] / cell))
+        size_j = max(1, round(size["width"] / cell))
+        if "grid" in coord:
+            g = coord["grid"]
+            grid_i, grid_j, sigma, mu = g["i"], g["j"], g["sigma"], g["mu"]
+        else:
+            pos = coord["position"]
+            grid_i = round(grid.height - pos["z"] / cell - size_i / 2)
+            grid_j = round(pos["x"] / cell - size_j / 2)
+            rotation = float(coord["rotation_y_degrees"]) % 360
+            sigma, mu = _ROTATION_TO_ORIENTATION.get(rotation, (0, 0))
+        return PlacedFurniture(
+            room_name=coord["room_name"],
+            name=coord["name"],
+            grid_i=grid_i,
+            grid_j=grid_j,
+            sigma=sigma,
+            mu=mu,
+            size_i=size_i,
+            size_j=size_j,
+            height=size.get("height", 0.0),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,79 @@
+"""In-process cache of built Gurobi placement models.
+
+Re-running placement with an unchanged grid, furniture list and constraints
+(common while iterating in the UI) reuses the built model instead of creating
+all variables and constraints again. Re-optimizing a solved model also lets
+Gurobi start from its previous solution.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+
+from .grid_types import FloorPlanGrid
+from .optimizer import FurnitureConstraints, FurniturePlacementModel, FurnitureSpec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MODELS = 4
+
+
+def model_cache_key(
+    grid: FloorPlanGrid,
+    furniture: dict[str, list[FurnitureSpec]],
+    constraints: dict[str, FurnitureConstraints],
+    **options,
+) -> str:
+    """Content hash of everything that goes into building a FurniturePlacementModel."""
+    payload = {
+        "grid": grid.to_dict(),
+        "furn": {room: [asdict(f) for f in items] for room, items in furniture.items()},
+        "cons": {room: asdict(c) for room, c in constraints.items()},
+        "opts": options,
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(blob, digest_size=16).hexdigest()
+
+
+class OptimizationCache:
+    """LRU of built FurniturePlacementModel instances.
+
+    get_or_build() checks a model out of the cache and release() puts it back,
+    so two concurrent runs never optimize the same Gurobi model.
+    """
+
+    def __init__(self, max_models: int = DEFAULT_MAX_MODELS):
+        self.max_models = max_models
+        self._models: OrderedDict[str, FurniturePlacementModel] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_build(
+        self,
+        grid: FloorPlanGrid,
+        furniture: dict[str, list[FurnitureSpec]],
+        constraints: dict[str, FurnitureConstraints],
+        **options,
+    ) -> tuple[str, FurniturePlacementModel]:
+        """Return (key, model), building the model if no identical one is cached."""
+        key = model_cache_key(grid, furniture, constraints, **options)
+        with self._lock:
+            model = self._models.pop(key, None)
+        if model is not None:
+            logger.info("Reusing cached placement model %s", key[:8])
+            return key, model
+        model = FurniturePlacementModel(
+            grid=grid, furniture=furniture, constraints=constraints, **options,
+        )
+        return key, model
+
+    def release(self, key: str, model: FurniturePlacementModel) -> None:
+        """Return a model to the cache, evicting the least recently used ones."""
+        with self._lock:
+            self._models[key] = model
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                _, evicted = self._models.popitem(last=False)
+                evicted.model.dispose()
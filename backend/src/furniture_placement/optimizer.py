@@ -143,6 +143,10 @@ class FurniturePlacementModel:
         time_limit: Gurobi time limit in seconds.
         mip_gap: Gurobi MIP optimality gap.
         threads: Number of solver threads.
+        presolve: Gurobi Presolve level (-1 auto, 0 off, 1 conservative, 2 aggressive).
+        heuristics: Fraction of MIP time spent in primal heuristics (None = Gurobi default).
+        lazy_distance: Add the distance-deviation rows as lazy constraints, so Gurobi
+            only pulls them into the LP when a candidate solution violates them.
     """
 
     def __init__(
@@ -154,9 +158,14 @@ class FurniturePlacementModel:
         time_limit: int = DEFAULT_TIME_LIMIT,
         mip_gap: float = DEFAULT_MIP_GAP,
         threads: int = DEFAULT_THREADS,
+        presolve: int = -1,
+        heuristics: float | None = None,
+        lazy_distance: bool = False,
     ):
         self.grid = grid
         self.weights = weights or DEFAULT_WEIGHTS
+        self.lazy_distance = lazy_distance
+        self.distance_constrs = []  # deviation rows, kept so they can be found later
         self.width = grid.height   # i-axis (rows, north-south)
         self.length = grid.width   # j-axis (columns, east-west)
 
@@ -201,6 +210,9 @@ class FurniturePlacementModel:
         self.model.Params.MIPGap = mip_gap
         self.model.Params.TimeLimit = time_limit
         self.model.setParam("Threads", threads)
+        self.model.setParam("Presolve", presolve)
+        if heuristics is not None:
+            self.model.setParam("Heuristics", heuristics)
         self.model.setParam("OutputFlag", 1)
 
         # Fixed grids (rooms are constants, not variables)
@@ -553,13 +565,20 @@ class FurniturePlacementModel:
                     ci2 = self.f_rect_min_i[k, l2] + half_l2_i
                     cj2 = self.f_rect_min_j[k, l2] + half_l2_j
 
-                    self.model.addConstr(de1 >= (ci2 - ci1) - d1 - M * (1 - z[case_idx]))
-                    self.model.addConstr(de1 >= (ci1 - ci2) + d1 - M * (1 - z[case_idx]))
-                    self.model.addConstr(de2 >= (cj2 - cj1) - d2 - M * (1 - z[case_idx]))
-                    self.model.addConstr(de2 >= (cj1 - cj2) + d2 - M * (1 - z[case_idx]))
+                    self.distance_constrs += [
+                        self.model.addConstr(de1 >= (ci2 - ci1) - d1 - M * (1 - z[case_idx])),
+                        self.model.addConstr(de1 >= (ci1 - ci2) + d1 - M * (1 - z[case_idx])),
+                        self.model.addConstr(de2 >= (cj2 - cj1) - d2 - M * (1 - z[case_idx])),
+                        self.model.addConstr(de2 >= (cj1 - cj2) + d2 - M * (1 - z[case_idx])),
+                    ]
 
                 self.objective_function += self.weights.get("distance", 0.6) * (de1 + de2)
 
+        if self.lazy_distance:
+            # Lazy=1: enforced on every incumbent, but kept out of node LPs until violated
+            for c in self.distance_constrs:
+                c.Lazy = 1
+
     def _add_objective(self):
         """Furniture balance: weighted center of furniture close to room center."""
         for k in range(self.room_num):
@@ -599,6 +618,66 @@ class FurniturePlacementModel:
             self.model.addConstr(err_j >= center_j - furn_cj)
             self.objective_function += self.weights.get("balance", 1.0) * (err_i + err_j)
 
+    def set_start(self, placements: list[PlacedFurniture]) -> int:
+        """Seed a partial MIP start from earlier placements. Returns items matched.
+
+        Only position and orientation variables are set; Gurobi completes the
+        cell assignment itself and discards the start if it can't be repaired.
+        """
+        index = {
+            (room_name, name): (k, idx)
+            for k, room_name in enumerate(self.room_name_list)
+            for idx, name in enumerate(self.furniture_name_list[k])
+        }
+        matched = 0
+        for p in placements:
+            kl = index.get((p.room_name, p.name))
+            if kl is None:
+                continue
+            self.f_rect_min_i[kl].Start = p.grid_i
+            self.f_rect_min_j[kl].Start = p.grid_j
+            self.sigma[kl].Start = p.sigma
+            self.mu[kl].Start = p.mu
+            matched += 1
+        return matched
+
+    def drop_distance_constraints(self) -> None:
+        """Remove the distance-target rows in place, e.g. to retry a failed solve.
+
+        Variables, presolve-relevant structure and the rest of the model are
+        kept; the deviation variables stay in the objective but are now free
+        to settle at 0.
+        """
+        self.model.remove(self.distance_constrs)
+        self.distance_constrs = []
+        for fc in self.furniture_constraints.values():
+            fc["distance_constraints"] = []
+        self.model.update()
+
+    def solve_lp_relaxation(self, seed_start: bool = True) -> bool:
+        """Solve the LP relaxation as a cheap feasibility check before the MIP.
+
+        Returns False if the relaxation (and therefore the MIP) is infeasible.
+        With seed_start, rounded position/orientation values from the LP
+        solution are set as a MIP start.
+        """
+        self.model.update()
+        relaxed = self.model.relax()
+        try:
+            relaxed.setObjective(0)
+            relaxed.optimize()
+            if relaxed.status in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+                logger.info("LP relaxation is infeasible")
+                return False
+            if seed_start and relaxed.SolCount > 0:
+                lp_vars = relaxed.getVars()
+                for var_dict in (self.f_rect_min_i, self.f_rect_min_j, self.sigma, self.mu):
+                    for var in var_dict.values():
+                        var.Start = round(lp_vars[var.index].X)
+            return True
+        finally:
+            relaxed.dispose()
+
     def optimize(self) -> list[PlacedFurniture]:
         """Run the optimizer and return placed furniture."""
         logger.info(
@@ -662,3 +741,65 @@ class FurniturePlacementModel:
                 )
 
         return results
+
+
+def greedy_placement(
+    grid: FloorPlanGrid,
+    furniture: dict[str, list[FurnitureSpec]],
+) -> list[PlacedFurniture]:
+    """Largest-first, non-overlapping placement that ignores all layout constraints.
+
+    Last-resort fallback when no relaxation of the MIP is feasible. Items that
+    fit nowhere in their room are skipped.
+    """
+    results = []
+    for room_name in grid.room_names:
+        cells = sorted(grid.room_cells.get(room_name, ()))
+        free = set(cells)
+        items = sorted(
+            furniture.get(room_name, []),
+            key=lambda f: int(f.length) * int(f.width),
+            reverse=True,
+        )
+        for f in items:
+            length, width = int(f.length), int(f.width)
+            spot = _first_fit(free, cells, length, width)
+            if spot is None:
+                logger.warning("Greedy placement: no space for %s in %s", f.name, room_name)
+                continue
+            gi, gj, sig = spot
+            # Same convention as _extract_solution: sigma=1 puts the short side along i
+            size_i, size_j = (width, length) if sig else (length, width)
+            free.difference_update(
+                (gi + di, gj + dj) for di in range(size_i) for dj in range(size_j)
+            )
+            results.append(PlacedFurniture(
+                room_name=room_name,
+                name=f.name,
+                grid_i=gi,
+                grid_j=gj,
+                sigma=sig,
+                mu=1,
+                size_i=size_i,
+                size_j=size_j,
+                height=f.height,
+            ))
+    return results
+
+
+def _first_fit(
+    free: set[tuple[int, int]],
+    cells: list[tuple[int, int]],
+    length: int,
+    width: int,
+) -> tuple[int, int, int] | None:
+    """First free (i, j, sigma) in row-major order where the footprint fits."""
+    for gi, gj in cells:
+        for sig, (size_i, size_j) in ((1, (width, length)), (0, (length, width))):
+            if all(
+                (gi + di, gj + dj) in free
+                for di in range(size_i)
+                for dj in range(size_j)
+            ):
+                return gi, gj, sig
+    return None
@@ -85,6 +85,17 @@ async def _color_rooms_with_nano_banana(binary_image_path: str, output_path: str
     Returns:
         Path to the saved colored image.
     """
+    with open(binary_image_path, "rb") as f:
+        img_bytes = f.read()
+    img_data = await _color_rooms_bytes(img_bytes)
+    with open(output_path, "wb") as f:
+        f.write(img_data)
+    logger.info("Colored room image saved: %s (%d bytes)", output_path, len(img_data))
+    return output_path
+
+
+async def _color_rooms_bytes(img_bytes: bytes) -> bytes:
+    """Nano Banana room coloring on in-memory PNG bytes; returns the colored image bytes."""
     import base64
     from openai import AsyncOpenAI
 
@@ -92,8 +103,6 @@ async def _color_rooms_with_nano_banana(binary_image_path: str, output_path: str
     if not api_key:
         raise RuntimeError("OPENROUTER_API_KEY not set")
 
-    with open(binary_image_path, "rb") as f:
-        img_bytes = f.read()
     b64 = base64.b64encode(img_bytes).decode()
     data_url = f"data:image/png;base64,{b64}"
 
@@ -164,13 +173,8 @@ async def _color_rooms_with_nano_banana(binary_image_path: str, output_path: str
     if not result_url:
         raise RuntimeError("Nano Banana did not return an image")
 
-    # Decode and save
     header, b64_data = result_url.split(",", 1)
-    img_data = base64.b64decode(b64_data)
-    with open(output_path, "wb") as f:
-        f.write(img_data)
-    logger.info("Colored room image saved: %s (%d bytes)", output_path, len(img_data))
-    return output_path
+    return base64.b64decode(b64_data)
 
 
 def _extract_regions_from_image(img: np.ndarray) -> tuple[np.ndarray, int]:
@@ -297,6 +301,22 @@ def build_grid_from_colored_image(
     img = cv2.imread(colored_image_path)
     if img is None:
         raise FileNotFoundError(f"Cannot load image: {colored_image_path}")
+    return _grid_from_bgr(img, target_width_m, cell_size)
+
+
+def build_grid_from_colored_bytes(
+    data: bytes,
+    target_width_m: float = 12.0,
+    cell_size: float = 0.25,
+) -> FloorPlanGrid:
+    """Build a FloorPlanGrid from encoded (PNG/JPEG) colored floor plan bytes."""
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Cannot decode colored floor plan image")
+    return _grid_from_bgr(img, target_width_m, cell_size)
+
+
+def _grid_from_bgr(img: np.ndarray, target_width_m: float, cell_size: float) -> FloorPlanGrid:
     img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
     img_h, img_w = img.shape[:2]
 
@@ -473,7 +473,8 @@ async def update_placements(session_id: str, body: PlacementResult):
 
 
 @app.post("/api/sessions/{session_id}/place")
-async def start_placement(session_id: str):
+async def start_placement(session_id: str, fresh: bool = Query(default=False)):
+    """Start a placement job. fresh=true re-plans from scratch (e.g. after a bad layout)."""
     session = db.get_session(session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -492,7 +493,7 @@ async def start_placement(session_id: str):
             else:
                 from .workflow.placement import place_furniture
                 _logger.info("No grid_data — falling back to Gemini placement for %s", session_id)
-                await place_furniture(session_id, job["id"])
+                await place_furniture(session_id, job["id"], fresh_zones=fresh)
             db.update_session(session_id, {"status": "complete"})
             _logger.info("Placement complete for %s", session_id)
         except Exception:
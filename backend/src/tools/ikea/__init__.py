@@ -13,4 +13,5 @@ Submodules:
     storage     — DO Spaces GLB upload
     pipeline    — Orchestrator (cache → search → relevance → GLB → cache)
     search      — Adapter between our FurnitureItemSpec and the pipeline
+    search_cache — In-memory TTL cache of pipeline results per query
 """
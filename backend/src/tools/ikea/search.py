@@ -13,6 +13,7 @@ except ImportError:
     from furniture_placement.furniture_agents import FurnitureItemSpec
 from .models import FurnitureQuery
 from .pipeline import run_pipeline
+from .search_cache import get_cached, put_cached
 
 logger = logging.getLogger(__name__)
 
@@ -147,7 +148,18 @@ async def search_ikea_products(
         len(queries), len(unique_queries),
     )
 
-    pipeline_results = await run_pipeline(unique_queries)
+    # Serve repeated queries from the in-memory cache; only misses hit the pipeline
+    pipeline_results = [get_cached(q) for q in unique_queries]
+    misses = [i for i, pr in enumerate(pipeline_results) if pr is None]
+    if misses:
+        fresh = await run_pipeline([unique_queries[i] for i in misses])
+        for i, pr in zip(misses, fresh):
+            pipeline_results[i] = pr
+            put_cached(unique_queries[i], pr)
+    logger.info(
+        "IKEA search: %d/%d unique queries served from memory cache",
+        len(unique_queries) - len(misses), len(unique_queries),
+    )
 
     # Map results back — reuse the same pipeline result for duplicate categories
     results = []
@@ -0,0 +1,52 @@
+"""In-memory TTL cache of IKEA pipeline results, keyed by query content.
+
+Sits in front of the pipeline (and its Qdrant cache) so identical queries from
+repeated placement runs skip the embedding lookup and IKEA API entirely.
+Only matched results are cached; misses and errors are retried next time.
+The cache is an LRU bounded by SEARCH_CACHE_MAX entries.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+
+from .models import FurnitureQuery, PipelineResult
+
+SEARCH_CACHE_TTL_S = 3600
+SEARCH_CACHE_MAX = 1024
+
+_cache: OrderedDict[str, tuple[float, PipelineResult]] = OrderedDict()
+
+
+def query_key(query: FurnitureQuery) -> str:
+    category = (query.category or "").lower().strip()
+    description = query.description.lower().strip()
+    return hashlib.sha1(f"{category}|{description}|{query.dimensions or ''}".encode()).hexdigest()
+
+
+def get_cached(query: FurnitureQuery) -> PipelineResult | None:
+    """Return a cached result for an identical query, or None if absent or expired."""
+    key = query_key(query)
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    expiry, result = entry
+    if expiry < time.monotonic():
+        del _cache[key]
+        return None
+    _cache.move_to_end(key)
+    return result
+
+
+def put_cached(query: FurnitureQuery, result: PipelineResult, ttl_s: float = SEARCH_CACHE_TTL_S) -> None:
+    """Cache a pipeline result if it found a product, evicting expired and oldest entries."""
+    if result.item is None:
+        return
+    now = time.monotonic()
+    for k in [k for k, (expiry, _) in _cache.items() if expiry < now]:
+        del _cache[k]
+    key = query_key(query)
+    _cache[key] = (now + ttl_s, result)
+    _cache.move_to_end(key)
+    while len(_cache) > SEARCH_CACHE_MAX:
+        _cache.popitem(last=False)
@@ -0,0 +1,67 @@
+"""Test the in-memory IKEA search cache (LRU eviction and TTL expiry).
+
+Usage:
+    cd backend/src
+    python -m tools.ikea.test_search_cache
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from tools.ikea import search_cache
+from tools.ikea.models import FurnitureItem, FurnitureQuery, PipelineResult
+
+
+def _query(n: int) -> FurnitureQuery:
+    return FurnitureQuery(description=f"item {n}", category="sofa")
+
+
+def _result(n: int) -> PipelineResult:
+    return PipelineResult(query=_query(n), source="ikea_api",
+                          item=FurnitureItem(item_code=f"{n:08d}"))
+
+
+def test_eviction():
+    search_cache._cache.clear()
+    old_max = search_cache.SEARCH_CACHE_MAX
+    search_cache.SEARCH_CACHE_MAX = 2
+    try:
+        search_cache.put_cached(_query(1), _result(1))
+        search_cache.put_cached(_query(2), _result(2))
+        # A hit makes 1 the most recently used, so 2 is evicted next
+        assert search_cache.get_cached(_query(1)) is not None
+        search_cache.put_cached(_query(3), _result(3))
+        assert len(search_cache._cache) == 2
+        assert search_cache.get_cached(_query(2)) is None
+        assert search_cache.get_cached(_query(1)).item.item_code == "00000001"
+        assert search_cache.get_cached(_query(3)).item.item_code == "00000003"
+    finally:
+        search_cache.SEARCH_CACHE_MAX = old_max
+        search_cache._cache.clear()
+
+
+def test_expiry():
+    search_cache._cache.clear()
+    try:
+        search_cache.put_cached(_query(1), _result(1), ttl_s=-1)
+        assert search_cache.get_cached(_query(1)) is None
+        assert not search_cache._cache
+
+        # Expired entries are swept on the next put even if never read again
+        search_cache.put_cached(_query(2), _result(2), ttl_s=-1)
+        search_cache.put_cached(_query(3), _result(3))
+        assert list(search_cache._cache) == [search_cache.query_key(_query(3))]
+
+        # Misses are not cached
+        search_cache.put_cached(_query(4), PipelineResult(query=_query(4), source="ikea_api"))
+        assert search_cache.get_cached(_query(4)) is None
+    finally:
+        search_cache._cache.clear()
+
+
+if __name__ == "__main__":
+    test_eviction()
+    test_expiry()
+    print("search_cache: all checks passed")
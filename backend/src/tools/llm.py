@@ -1,10 +1,19 @@
 """OpenRouter LLM client — unified access to Claude and Gemini models."""
 
 import logging
+from collections.abc import AsyncIterator
 
 import httpx
-from openai import AsyncOpenAI
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    AsyncStream,
+    InternalServerError,
+    RateLimitError,
+)
+from pydantic import BaseModel
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 
 from ..config import CLAUDE_MODEL, GEMINI_MODEL, OPENROUTER_API_KEY
 
@@ -14,6 +23,9 @@ _client = AsyncOpenAI(
     base_url="https://openrouter.ai/api/v1",
     api_key=OPENROUTER_API_KEY or "no-key-configured",
     timeout=120.0,
+    # Retries are owned by _llm_retry below; leaving the SDK's own retries on
+    # would multiply attempts (3 x 3) while a caller holds a semaphore slot.
+    max_retries=0,
 )
 
 _EXTRA_HEADERS = {
@@ -21,10 +33,23 @@ _EXTRA_HEADERS = {
     "X-Title": "HomeDesigner",
 }
 
+# The OpenAI SDK raises its own error types for 429/5xx/timeouts rather than httpx ones.
+# This is the only retry layer (the client has max_retries=0); jittered backoff keeps
+# parallel zone calls from retrying in lockstep.
 _llm_retry = retry(
     stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=10),
-    retry=retry_if_exception_type((httpx.HTTPStatusError, httpx.ConnectError, httpx.TimeoutException)),
+    wait=wait_random_exponential(multiplier=0.5, max=8),
+    retry=retry_if_exception_type(
+        (
+            RateLimitError,
+            InternalServerError,
+            APITimeoutError,
+            APIConnectionError,
+            httpx.HTTPStatusError,
+            httpx.TransportError,
+        )
+    ),
+    reraise=True,
 )
 
 
@@ -63,6 +88,14 @@ async def call_gemini(
     return resp.choices[0].message.content or ""
 
 
+def _json_schema_format(schema: type[BaseModel]) -> dict:
+    """Build an OpenAI-style response_format that constrains output to a Pydantic schema."""
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()},
+    }
+
+
 def _image_content_part(image_url_or_base64: str) -> dict:
     """Build an image_url content part from a URL or base64 string."""
     if image_url_or_base64.startswith("data:"):
@@ -85,27 +118,78 @@ async def call_gemini_with_image(
     return await call_gemini_with_images(prompt, [image_url_or_base64], temperature=temperature)
 
 
+def _gemini_images_request(
+    prompt: str,
+    image_urls: list[str],
+    temperature: float,
+    response_schema: type[BaseModel] | None,
+) -> dict:
+    """Build chat.completions.create kwargs for a Gemini text + images prompt."""
+    content: list[dict] = [{"type": "text", "text": prompt}]
+    for url in image_urls:
+        content.append(_image_content_part(url))
+
+    kwargs: dict = {
+        "model": GEMINI_MODEL,
+        "messages": [{"role": "user", "content": content}],
+        "temperature": temperature,
+        "extra_headers": _EXTRA_HEADERS,
+    }
+    if response_schema is not None:
+        kwargs["response_format"] = _json_schema_format(response_schema)
+    return kwargs
+
+
 @_llm_retry
 async def call_gemini_with_images(
     prompt: str,
     image_urls: list[str],
     temperature: float = 0.3,
+    response_schema: type[BaseModel] | None = None,
 ) -> str:
-    """Call Gemini with multiple images + text prompt. Returns the text content."""
-    content: list[dict] = [{"type": "text", "text": prompt}]
-    for url in image_urls:
-        content.append(_image_content_part(url))
+    """Call Gemini with multiple images + text prompt. Returns the text content.
 
-    messages = [{"role": "user", "content": content}]
+    If response_schema is given, the model is asked for raw JSON matching that schema.
+    """
     resp = await _client.chat.completions.create(
-        model=GEMINI_MODEL,
-        messages=messages,
-        temperature=temperature,
-        extra_headers=_EXTRA_HEADERS,
+        **_gemini_images_request(prompt, image_urls, temperature, response_schema)
     )
     return resp.choices[0].message.content or ""
 
 
+@_llm_retry
+async def _open_gemini_stream(
+    prompt: str,
+    image_urls: list[str],
+    temperature: float,
+    response_schema: type[BaseModel] | None,
+) -> AsyncStream:
+    # 429/5xx surface when the stream is opened, so this is the part worth retrying
+    return await _client.chat.completions.create(
+        **_gemini_images_request(prompt, image_urls, temperature, response_schema),
+        stream=True,
+    )
+
+
+async def stream_gemini_with_images(
+    prompt: str,
+    image_urls: list[str],
+    temperature: float = 0.3,
+    response_schema: type[BaseModel] | None = None,
+) -> AsyncIterator[str]:
+    """Like call_gemini_with_images, but yields text deltas as they arrive.
+
+    Closing the iterator early closes the HTTP stream, which stops generation.
+    """
+    stream = await _open_gemini_stream(prompt, image_urls, temperature, response_schema)
+    try:
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        await stream.close()
+
+
 @_llm_retry
 async def call_claude_with_image(
     prompt: str,
@@ -1,13 +1,19 @@
 """Furniture placement workflow — zone-based parallel Gemini placement + verification loop."""
 
 import asyncio
-import json
+import hashlib
 import logging
-import re
 import time
+from collections import Counter
+from dataclasses import dataclass
+from itertools import chain
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+from pydantic_core import from_json
 
 from .. import db
-from ..config import GEMINI_MODEL
+from ..config import GEMINI_MAX_CONCURRENCY, GEMINI_MODEL
 from ..models.schemas import (
     FurnitureDimensions,
     FurnitureItem,
@@ -18,12 +24,12 @@ from ..models.schemas import (
     RoomData,
     ZoneDecomposition,
 )
-from ..models.verification import PlacementVerificationResult
+from ..models.verification import PlacementVerificationResult, VerifyAndFixResult
 from ..prompts.placement import placement_prompt
 from ..prompts.verify_and_fix import verify_and_fix_prompt
 from ..prompts.zone_decomposition import zone_decomposition_prompt
 from ..prompts.zone_placement import zone_placement_prompt
-from ..tools.llm import call_gemini_with_images
+from ..tools.llm import call_gemini_with_images, stream_gemini_with_images
 from ..tools.placement_renderer import render_placement_data_url
 from ..tools.placement_validator import auto_fix_placements, validate_placements
 from ..tools.scene_renderer import render_scene_3d_views
@@ -38,64 +44,230 @@ def _trace_event(step: str, message: str, **kwargs) -> dict:
     return evt
 
 
+# Trace image fields. The tracing API drops inline data URLs before serving a trace,
+# so they are stripped on write instead of being re-serialized on every update.
+_TRACE_IMAGE_FIELDS = ("input_image", "output_image", "image_url")
+
+
+def _strip_inline_images(evt: dict) -> dict:
+    for field in _TRACE_IMAGE_FIELDS:
+        val = evt.get(field)
+        if isinstance(val, str) and val.startswith("data:"):
+            evt[field] = None
+    imgs = evt.get("input_images")
+    if isinstance(imgs, list):
+        evt["input_images"] = [
+            u for u in imgs if not (isinstance(u, str) and u.startswith("data:"))
+        ]
+    return evt
+
+
+class TraceWriter:
+    """Collects a job's trace events and coalesces DB writes on a short timer.
+
+    Each db.update_job rewrites the whole trace, so bursts of events are
+    batched into a single write. Call flush() for terminal status updates.
+    """
+
+    def __init__(self, job_id: str, delay_s: float = 0.25):
+        self.job_id = job_id
+        self.events: list[dict] = []
+        self._delay_s = delay_s
+        self._flush_task: asyncio.Task | None = None  # set only while waiting out the delay
+        self._tasks: set[asyncio.Task] = set()  # debounced writes not yet finished
+
+    def append(self, evt: dict) -> None:
+        self.events.append(_strip_inline_images(evt))
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_soon())
+            self._tasks.add(self._flush_task)
+            self._flush_task.add_done_callback(self._tasks.discard)
+
+    async def _flush_soon(self) -> None:
+        await asyncio.sleep(self._delay_s)
+        self._flush_task = None
+        try:
+            await asyncio.to_thread(db.update_job, self.job_id, {"trace": list(self.events)})
+        except Exception:
+            logger.warning("Failed to write trace for job %s", self.job_id, exc_info=True)
+
+    async def flush(self, **updates) -> None:
+        """Write the trace (plus any extra job fields) now, superseding a pending write."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()  # still sleeping, so nothing was written yet
+            self._flush_task = None
+        # Let in-flight debounced writes land first so they can't overwrite this one
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.to_thread(db.update_job, self.job_id, {"trace": self.events, **updates})
+
+
 MAX_ATTEMPTS = 1
 QUALITY_THRESHOLD = 0.75
 MAX_VERIFY_ITERATIONS = 3
+VERIFY_TIMEOUT_S = 180  # render + verify+fix call for one iteration
+ZONE_CACHE_TTL_S = 3600  # reuse a decomposition across runs with identical inputs
+ZONE_MIN_ITEMS = 5  # below this, zones hold ~1 item each; single-call placement is cheaper
+
+# Shared across all placement jobs in this process so parallel zones can't stampede Gemini
+_GEMINI_SEM = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+
+async def _call_gemini(
+    prompt: str,
+    images: list[str],
+    response_schema: type[BaseModel] | None = None,
+) -> str:
+    """Call Gemini with images, bounded by the process-wide concurrency limit."""
+    async with _GEMINI_SEM:
+        return await call_gemini_with_images(prompt, images, response_schema=response_schema)
+
+
+async def _stream_verify_and_fix(prompt: str, images: list[str]) -> tuple[str, dict]:
+    """Run the verify+fix call, stopping early once the evaluation already passes.
+
+    The response puts "evaluation" before "placements", and a passing layout's
+    placements are discarded, so generation is cut off as soon as the score is known.
+    Returns the raw text received and the parsed (possibly partial) response.
+    """
+    raw = ""
+    async with _GEMINI_SEM:
+        stream = stream_gemini_with_images(prompt, images, response_schema=VerifyAndFixResult)
+        try:
+            async for delta in stream:
+                tail = len(raw)
+                raw += delta
+                # The placements key only appears once the evaluation object is complete
+                if '"placements"' not in raw[max(0, tail - 16) :]:
+                    continue
+                start = raw.find("{")
+                data = from_json(raw[start:], allow_partial=True) if start != -1 else {}
+                score = (data.get("evaluation") or {}).get("overall_score")
+                if isinstance(score, int | float) and score >= QUALITY_THRESHOLD:
+                    return raw, data
+                break
+            async for delta in stream:
+                raw += delta
+        finally:
+            await stream.aclose()
+    return raw, from_json(_extract_json(raw))
+
+
+def _balanced_object(text: str, start: int) -> str | None:
+    """Return the brace-balanced object opening at text[start], ignoring braces in strings."""
+    depth = 0
+    in_string = escape = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return text[start : i + 1]
+    return None
 
 
 def _extract_json(text: str) -> str:
     """Strip markdown fences or surrounding prose to isolate JSON."""
-    m = re.search(r"```(?:json)?\s*(\{[\s\S]*\})\s*```", text)
-    if m:
-        return m.group(1)
-    m = re.search(r"(\{[\s\S]*\})", text)
-    if m:
-        return m.group(1)
-    return text
+    stripped = text.strip()
+    if stripped[:1] == "{" and stripped[-1:] == "}":
+        return stripped
+    fence = text.find("```")
+    start = text.find("{", fence if fence != -1 else 0)
+    if start == -1 and fence != -1:
+        start = text.find("{")
+    if start == -1:
+        return text
+    obj = _balanced_object(text, start)
+    if obj is not None:
+        return obj
+    # Unbalanced (e.g. truncated output) — hand the widest candidate to the parser
+    end = text.rfind("}")
+    return text[start : end + 1] if end > start else text
+
+
+def _placements_key(placements: list[FurniturePlacement]) -> tuple:
+    """Hashable signature of a layout: item ids with their positions and rotations."""
+    return tuple(
+        sorted(
+            (p.item_id, p.position.x, p.position.y, p.position.z, p.rotation_y_degrees)
+            for p in placements
+        )
+    )
 
 
-def _build_dims_map(
-    furniture: list[FurnitureItem],
-) -> dict[str, FurnitureDimensions | None]:
-    """Build a lookup from item_id to its dimensions."""
-    return {f.id: f.dimensions for f in furniture}
+_DEFAULT_HALVES = (0.25, 0.25)  # half extents assumed for items without dimensions
+
+
+@dataclass
+class FurnitureIndex:
+    """Id lookups over a job's furniture, built once and shared by every phase."""
+
+    by_id: dict[str, FurnitureItem]
+    dims: dict[str, FurnitureDimensions | None]
+    halves: dict[str, tuple[float, float]]  # unrotated (half width, half depth) in metres
+
+    @classmethod
+    def build(cls, furniture: list[FurnitureItem]) -> "FurnitureIndex":
+        return cls(
+            by_id={f.id: f for f in furniture},
+            dims={f.id: f.dimensions for f in furniture},
+            halves={
+                f.id: (f.dimensions.width_cm / 200, f.dimensions.depth_cm / 200)
+                if f.dimensions
+                else _DEFAULT_HALVES
+                for f in furniture
+            },
+        )
 
 
 def _clamp_placements(
     placements: list[FurniturePlacement],
     room: RoomData,
-    dims_map: dict[str, FurnitureDimensions | None],
+    index: FurnitureIndex,
 ) -> list[FurniturePlacement]:
     """Clamp placement positions so items stay within room bounds (apartment-absolute)."""
+    if not placements:
+        return []
+
     x_min = room.x_offset_m
     x_max = room.x_offset_m + room.width_m
     z_min = room.z_offset_m
     z_max = room.z_offset_m + room.length_m
 
+    halves = np.array([index.halves.get(p.item_id, _DEFAULT_HALVES) for p in placements])
+    half_w, half_d = halves[:, 0], halves[:, 1]
+    xs = np.array([p.position.x for p in placements])
+    ys = np.array([p.position.y for p in placements])
+    zs = np.array([p.position.z for p in placements])
+
+    # Swap for rotated items
+    rot = np.array([p.rotation_y_degrees for p in placements]) % 360
+    rotated = ((rot > 45) & (rot < 135)) | ((rot > 225) & (rot < 315))
+    half_w, half_d = np.where(rotated, half_d, half_w), np.where(rotated, half_w, half_d)
+
+    x = np.round(np.maximum(x_min + half_w, np.minimum(x_max - half_w, xs)), 3)
+    z = np.round(np.maximum(z_min + half_d, np.minimum(z_max - half_d, zs)), 3)
+    y = np.round(ys, 3)
+    changed = (x != xs) | (y != ys) | (z != zs)
+
+    # Only rebuild items whose position actually moved; inputs are already validated
     clamped = []
-    for p in placements:
-        dims = dims_map.get(p.item_id)
-        half_w = (dims.width_cm / 200) if dims else 0.25
-        half_d = (dims.depth_cm / 200) if dims else 0.25
-
-        # Swap for rotated items
-        rot = p.rotation_y_degrees % 360
-        if 45 < rot < 135 or 225 < rot < 315:
-            half_w, half_d = half_d, half_w
-
-        x = max(x_min + half_w, min(x_max - half_w, p.position.x))
-        z = max(z_min + half_d, min(z_max - half_d, p.position.z))
-        y = p.position.y
-
-        clamped.append(
-            FurniturePlacement(
-                item_id=p.item_id,
-                name=p.name,
-                position=Position3D(x=round(x, 3), y=round(y, 3), z=round(z, 3)),
-                rotation_y_degrees=p.rotation_y_degrees,
-                reasoning=p.reasoning,
-            )
-        )
+    for p, moved, cx, cy, cz in zip(placements, changed, x.tolist(), y.tolist(), z.tolist()):
+        if moved:
+            position = Position3D.model_construct(x=cx, y=cy, z=cz)
+            p = p.model_copy(update={"position": position})
+        clamped.append(p)
     return clamped
 
 
@@ -104,21 +276,54 @@ def _clamp_placements(
 # ---------------------------------------------------------------------------
 
 
+def _zone_cache_key(
+    room: RoomData,
+    furniture: list[FurnitureItem],
+    all_rooms: list[RoomData] | None,
+    input_images: list[str],
+) -> str:
+    """Content address for a decomposition: everything that goes into the prompt, plus model."""
+    h = hashlib.sha256()
+    h.update(room.model_dump_json().encode())
+    for r in all_rooms or []:
+        h.update(r.model_dump_json().encode())
+    for f in sorted(furniture, key=lambda f: f.id):
+        h.update(f.model_dump_json().encode())
+    for url in input_images:
+        h.update(hashlib.blake2b(url.encode(), digest_size=16).digest())
+    h.update(GEMINI_MODEL.encode())
+    return h.hexdigest()
+
+
 async def _decompose_zones(
     room: RoomData,
     furniture: list[FurnitureItem],
     all_rooms: list[RoomData] | None,
     input_images: list[str],
-    trace: list[dict],
-    job_id: str,
+    trace: TraceWriter,
+    use_cache: bool = True,
 ) -> ZoneDecomposition | None:
-    """Ask Gemini to divide the room into functional zones. Returns None on failure."""
+    """Ask Gemini to divide the room into functional zones. Returns None on failure.
+
+    With use_cache=False a fresh decomposition is requested (and replaces the cached one).
+    """
     t0 = time.time()
     trace.append(_trace_event("zone_decomposition", "Decomposing room into zones"))
-    db.update_job(job_id, {"trace": trace})
+
+    cache_key = _zone_cache_key(room, furniture, all_rooms, input_images)
+    cached = db.get_zone_cache(cache_key) if use_cache else None
+    if cached is not None:
+        decomposition = ZoneDecomposition.model_validate(cached)
+        trace.append(
+            _trace_event(
+                "zone_decomposition_cached",
+                f"Reused cached zone decomposition ({len(decomposition.zones)} zones)",
+            )
+        )
+        return decomposition
 
     prompt = zone_decomposition_prompt(room, furniture, all_rooms)
-    raw = await call_gemini_with_images(prompt, input_images)
+    raw = await _call_gemini(prompt, input_images, ZoneDecomposition)
     duration_ms = (time.time() - t0) * 1000
 
     trace.append(
@@ -132,23 +337,18 @@ async def _decompose_zones(
             model=GEMINI_MODEL,
         )
     )
-    db.update_job(job_id, {"trace": trace})
 
     try:
-        json_str = _extract_json(raw)
-        data = json.loads(json_str)
-        decomposition = ZoneDecomposition.model_validate(data)
+        decomposition = ZoneDecomposition.model_validate_json(_extract_json(raw))
 
         # Validate: every furniture item must be assigned to exactly one zone
         furniture_ids = {f.id for f in furniture}
-        assigned_ids: set[str] = set()
-        for zone in decomposition.zones:
-            for fid in zone.furniture_ids:
-                if fid in assigned_ids:
-                    logger.warning("Zone decomposition: item %s assigned to multiple zones", fid)
-                assigned_ids.add(fid)
-
-        unassigned = furniture_ids - assigned_ids
+        assignments = Counter(chain.from_iterable(z.furniture_ids for z in decomposition.zones))
+        duplicated = [fid for fid, n in assignments.items() if n > 1]
+        if duplicated:
+            logger.warning("Zone decomposition: items assigned to multiple zones: %s", duplicated)
+
+        unassigned = furniture_ids - assignments.keys()
         if unassigned:
             logger.warning(
                 "Zone decomposition: %d items unassigned: %s", len(unassigned), unassigned
@@ -164,6 +364,7 @@ async def _decompose_zones(
             len(decomposition.zones),
             [(z.name, len(z.furniture_ids)) for z in decomposition.zones],
         )
+        db.set_zone_cache(cache_key, decomposition.model_dump(mode="json"), ZONE_CACHE_TTL_S)
         return decomposition
 
     except Exception as e:
@@ -174,7 +375,6 @@ async def _decompose_zones(
                 f"Zone decomposition failed: {e}, falling back to single-call placement",
             )
         )
-        db.update_job(job_id, {"trace": trace})
         return None
 
 
@@ -186,17 +386,15 @@ async def _decompose_zones(
 async def _place_zone(
     zone: FurnitureZone,
     room: RoomData,
-    furniture: list[FurnitureItem],
+    index: FurnitureIndex,
     other_zones: list[FurnitureZone],
     all_rooms: list[RoomData] | None,
     input_images: list[str],
     zone_index: int,
-    trace: list[dict],
-    job_id: str,
+    trace: TraceWriter,
 ) -> dict:
     """Place furniture in a single zone. Returns dict with placements and metadata."""
-    furniture_map = {f.id: f for f in furniture}
-    zone_furniture = [furniture_map[fid] for fid in zone.furniture_ids if fid in furniture_map]
+    zone_furniture = [index.by_id[fid] for fid in zone.furniture_ids if fid in index.by_id]
 
     if not zone_furniture:
         logger.warning("Zone '%s' has no matching furniture items", zone.name)
@@ -204,7 +402,7 @@ async def _place_zone(
 
     t0 = time.time()
     prompt = zone_placement_prompt(zone, room, zone_furniture, other_zones, all_rooms=all_rooms)
-    raw = await call_gemini_with_images(prompt, input_images)
+    raw = await _call_gemini(prompt, input_images, PlacementResult)
     duration_ms = round((time.time() - t0) * 1000)
 
     logger.info(
@@ -215,9 +413,7 @@ async def _place_zone(
     )
 
     try:
-        json_str = _extract_json(raw)
-        data = json.loads(json_str)
-        result = PlacementResult.model_validate(data)
+        result = PlacementResult.model_validate_json(_extract_json(raw))
         return {
             "placements": result.placements,
             "duration_ms": duration_ms,
@@ -235,27 +431,23 @@ async def _place_zone(
         }
 
 
-async def _zone_placement_pipeline(
+async def _settle(coro):
+    """Await coro, returning its exception instead of raising so sibling tasks keep running."""
+    try:
+        return await coro
+    except Exception as e:
+        return e
+
+
+async def _place_zones_given_decomposition(
+    decomposition: ZoneDecomposition,
     room: RoomData,
-    furniture: list[FurnitureItem],
+    index: FurnitureIndex,
     all_rooms: list[RoomData] | None,
     input_images: list[str],
-    trace: list[dict],
-    job_id: str,
+    trace: TraceWriter,
 ) -> list[FurniturePlacement] | None:
-    """Run zone decomposition + parallel per-zone placement. Returns None on failure."""
-
-    # Phase 1: Decompose
-    decomposition = await _decompose_zones(
-        room,
-        furniture,
-        all_rooms,
-        input_images,
-        trace,
-        job_id,
-    )
-    if decomposition is None or len(decomposition.zones) == 0:
-        return None
+    """Run parallel per-zone placement for a decomposition. Returns None on failure."""
 
     # Phase 2: Parallel per-zone placement
     t0 = time.time()
@@ -265,66 +457,74 @@ async def _zone_placement_pipeline(
             f"Placing furniture in {len(decomposition.zones)} zones in parallel",
         )
     )
-    db.update_job(job_id, {"trace": trace})
-
-    tasks = []
-    for i, zone in enumerate(decomposition.zones):
-        other_zones = [z for z in decomposition.zones if z.name != zone.name]
-        tasks.append(
-            _place_zone(
-                zone,
-                room,
-                furniture,
-                other_zones,
-                all_rooms,
-                input_images,
-                i,
-                trace,
-                job_id,
-            )
-        )
-
-    zone_results = await asyncio.gather(*tasks, return_exceptions=True)
-    duration_ms = (time.time() - t0) * 1000
 
-    # Phase 3: Merge results
+    # Phase 3: Merge results as each zone finishes so the trace updates progressively.
+    # The TaskGroup cancels in-flight zone calls if the pipeline itself is cancelled.
     all_placements: list[FurniturePlacement] = []
     placed_ids: set[str] = set()
 
-    for i, (zone, result) in enumerate(zip(decomposition.zones, zone_results)):
-        if isinstance(result, Exception):
-            logger.warning("Zone '%s' failed: %s", zone.name, result)
-            trace.append(
-                _trace_event(
-                    f"zone_placement_error_{i}",
-                    f"Zone '{zone.name}' failed: {result}",
-                    error=str(result),
+    async with asyncio.TaskGroup() as tg:
+        zones = decomposition.zones
+        task_to_zone: dict[asyncio.Task, tuple[int, FurnitureZone]] = {}
+        for i, zone in enumerate(zones):
+            other_zones = zones[:i] + zones[i + 1 :]
+            task = tg.create_task(
+                _settle(
+                    _place_zone(
+                        zone,
+                        room,
+                        index,
+                        other_zones,
+                        all_rooms,
+                        input_images,
+                        i,
+                        trace,
+                    )
                 )
             )
-            continue
+            task_to_zone[task] = (i, zone)
+
+        pending = set(task_to_zone)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i, zone = task_to_zone[task]
+                result = task.result()
+                if isinstance(result, Exception):
+                    logger.warning("Zone '%s' failed: %s", zone.name, result)
+                    trace.append(
+                        _trace_event(
+                            f"zone_placement_error_{i}",
+                            f"Zone '{zone.name}' failed: {result}",
+                            error=str(result),
+                        )
+                    )
+                    continue
 
-        placements = result["placements"]
-        for p in placements:
-            if p.item_id not in placed_ids:
-                all_placements.append(p)
-                placed_ids.add(p.item_id)
+                placements = result["placements"]
+                for p in placements:
+                    if p.item_id not in placed_ids:
+                        all_placements.append(p)
+                        placed_ids.add(p.item_id)
 
-        trace.append(
-            _trace_event(
-                f"zone_placement_result_{i}",
-                f"Zone '{zone.name}': placed {len(placements)} items",
-                duration_ms=result.get("duration_ms", 0),
-                input_prompt=result.get("prompt", "")[:4000],
-                output_text=result.get("raw", "")[:4000],
-                model=GEMINI_MODEL,
-                data={
-                    "zone": zone.name,
-                    "items": [p.name for p in placements],
-                    "polygon": zone.polygon,
-                    "error": result.get("error"),
-                },
-            )
-        )
+                trace.append(
+                    _trace_event(
+                        f"zone_placement_result_{i}",
+                        f"Zone '{zone.name}': placed {len(placements)} items",
+                        duration_ms=result.get("duration_ms", 0),
+                        input_prompt=result.get("prompt", "")[:4000],
+                        output_text=result.get("raw", "")[:4000],
+                        model=GEMINI_MODEL,
+                        data={
+                            "zone": zone.name,
+                            "items": [p.name for p in placements],
+                            "polygon": zone.polygon,
+                            "error": result.get("error"),
+                        },
+                    )
+                )
+
+    duration_ms = (time.time() - t0) * 1000
 
     trace.append(
         _trace_event(
@@ -334,21 +534,20 @@ async def _zone_placement_pipeline(
             data={"total_items": len(all_placements), "zones": len(decomposition.zones)},
         )
     )
-    db.update_job(job_id, {"trace": trace})
 
     # Check if we got enough items
-    if len(all_placements) < len(furniture) * 0.5:
+    if len(all_placements) < len(index.by_id) * 0.5:
         logger.warning(
             "Zone pipeline placed only %d/%d items, falling back",
             len(all_placements),
-            len(furniture),
+            len(index.by_id),
         )
         return None
 
     logger.info(
         "Zone pipeline: %d/%d items placed across %d zones",
         len(all_placements),
-        len(furniture),
+        len(index.by_id),
         len(decomposition.zones),
     )
     return all_placements
@@ -367,8 +566,7 @@ async def _single_call_placement(
     dims_map: dict[str, FurnitureDimensions | None],
     original_floorplan_url: str | None,
     room_diagram_url: str,
-    trace: list[dict],
-    job_id: str,
+    trace: TraceWriter,
 ) -> PlacementResult:
     """Original single-call placement as fallback."""
     prompt = placement_prompt(room, furniture, all_rooms=all_rooms)
@@ -383,7 +581,6 @@ async def _single_call_placement(
                 f"Calling Gemini (attempt {attempt})",
             )
         )
-        db.update_job(job_id, {"trace": trace})
 
         if errors:
             error_feedback = (
@@ -394,7 +591,7 @@ async def _single_call_placement(
         else:
             full_prompt = prompt
 
-        raw = await call_gemini_with_images(full_prompt, input_images)
+        raw = await _call_gemini(full_prompt, input_images, PlacementResult)
 
         duration_ms = (time.time() - t0) * 1000
         trace.append(
@@ -410,22 +607,18 @@ async def _single_call_placement(
                 model=GEMINI_MODEL,
             )
         )
-        db.update_job(job_id, {"trace": trace})
 
         logger.info("Attempt %d: got Gemini response (%d chars)", attempt, len(raw))
         json_str = _extract_json(raw)
         try:
-            data = json.loads(json_str)
-        except json.JSONDecodeError:
-            logger.warning("Attempt %d: failed to parse JSON:\n%s", attempt, json_str[:500])
-            errors = [
-                "Your response was not valid JSON. Return ONLY a JSON object with a 'placements' array."
-            ]
-            continue
-
-        try:
-            result = PlacementResult.model_validate(data)
-        except Exception as e:
+            result = PlacementResult.model_validate_json(json_str)
+        except ValidationError as e:
+            if any(err["type"] == "json_invalid" for err in e.errors()):
+                logger.warning("Attempt %d: failed to parse JSON:\n%s", attempt, json_str[:500])
+                errors = [
+                    "Your response was not valid JSON. Return ONLY a JSON object with a 'placements' array."
+                ]
+                continue
             logger.warning("Attempt %d: invalid placement schema: %s", attempt, e)
             errors = [f"Invalid response schema: {e}. Follow the exact output format."]
             continue
@@ -444,7 +637,6 @@ async def _single_call_placement(
                 data={"errors": errors},
             )
         )
-        db.update_job(job_id, {"trace": trace})
         logger.info("Attempt %d: %d validation errors, retrying", attempt, len(errors))
 
     if result is None:
@@ -460,21 +652,87 @@ async def _single_call_placement(
     return result
 
 
+async def _render_initial_views(
+    room_glb_url: str | None,
+    furniture: list[FurnitureItem],
+    all_rooms: list[RoomData] | None,
+    trace: TraceWriter,
+) -> list[str]:
+    """Render the empty room from several angles. Returns [] if unavailable."""
+    if not room_glb_url:
+        return []
+
+    t_render = time.time()
+    room_3d_views: list[str] = []
+    try:
+        room_3d_views = await render_scene_3d_views(
+            room_glb_url,
+            [],
+            furniture,
+            all_rooms,
+        )
+        trace.append(
+            _trace_event(
+                "initial_3d_render",
+                f"Rendered {len(room_3d_views)} initial 3D views",
+                duration_ms=round((time.time() - t_render) * 1000),
+            )
+        )
+    except Exception as e:
+        logger.warning("Failed to render 3D views for initial placement: %s", e)
+        trace.append(
+            _trace_event(
+                "initial_3d_render_error",
+                f"3D render failed: {e}",
+                duration_ms=round((time.time() - t_render) * 1000),
+            )
+        )
+    return room_3d_views
+
+
+async def _render_verify_views(
+    room: RoomData,
+    room_glb_url: str | None,
+    placements: list[FurniturePlacement],
+    furniture: list[FurnitureItem],
+    all_rooms: list[RoomData] | None,
+) -> list[str]:
+    """Render the 3D views and 2D diagram for one verify iteration, concurrently."""
+    diagram = asyncio.to_thread(render_placement_data_url, room, placements, furniture)
+    if not room_glb_url:
+        return [await diagram]
+    scene_urls, diagram_url = await asyncio.gather(
+        render_scene_3d_views(room_glb_url, placements, furniture, all_rooms),
+        diagram,
+    )
+    return [*scene_urls, diagram_url]
+
+
+async def _floorplan_data_url(floorplan_url: str | None) -> str | None:
+    """Inline the floorplan as a data URL (external APIs can't reach localhost)."""
+    if not floorplan_url:
+        return None
+    return await _to_data_url(floorplan_url)
+
+
 # ---------------------------------------------------------------------------
 # Main entry point
 # ---------------------------------------------------------------------------
 
 
-async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
+async def place_furniture(
+    session_id: str, job_id: str, fresh_zones: bool = False
+) -> PlacementResult:
     """Run the placement pipeline: zone decomposition → parallel placement → verify/fix.
 
-    Falls back to single-call placement if zone decomposition fails.
+    Falls back to single-call placement if zone decomposition fails. fresh_zones skips
+    the zone decomposition cache (used when re-placing after a bad layout).
     """
-    trace: list[dict] = []
+    trace = TraceWriter(job_id)
 
     try:
         trace.append(_trace_event("started", "Placement pipeline started (zone-based)"))
-        db.update_job(job_id, {"status": "running", "trace": trace})
+        await trace.flush(status="running")
 
         session = db.get_session(session_id)
         if not session:
@@ -517,12 +775,10 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
                 )
             )
 
-        dims_map = _build_dims_map(furniture)
+        index = FurnitureIndex.build(furniture)
         room_glb_url = session.get("room_glb_url")
         floorplan_url = session.get("floorplan_url")
         original_floorplan_url = floorplan_url
-        if floorplan_url:
-            floorplan_url = await _to_data_url(floorplan_url)
 
         trace.append(
             _trace_event(
@@ -543,61 +799,68 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
                 },
             )
         )
-        db.update_job(job_id, {"trace": trace})
 
         db.update_session(session_id, {"status": "placing"})
 
-        # Pre-render room context images
-        room_diagram_url = render_placement_data_url(room, [], furniture)
-        room_3d_views: list[str] = []
-        if room_glb_url:
-            t_render = time.time()
-            try:
-                room_3d_views = await render_scene_3d_views(
-                    room_glb_url,
-                    [],
+        # Pre-render room context images. The 3D render is independent of everything
+        # else, so it starts first; the floorplan data URL and 2D diagram are built
+        # concurrently, then zone decomposition (which only needs those two) runs
+        # while the 3D render finishes.
+        scene_task = asyncio.create_task(
+            _render_initial_views(room_glb_url, furniture, all_rooms, trace)
+        )
+        try:
+            floorplan_url, room_diagram_url = await asyncio.gather(
+                _floorplan_data_url(floorplan_url),
+                asyncio.to_thread(render_placement_data_url, room, [], furniture),
+            )
+            decomposition = None
+            if len(furniture) >= ZONE_MIN_ITEMS:
+                decomposition_images = [u for u in (floorplan_url, room_diagram_url) if u]
+                decomposition = await _decompose_zones(
+                    room,
                     furniture,
                     all_rooms,
+                    decomposition_images,
+                    trace,
+                    use_cache=not fresh_zones,
                 )
-                trace.append(
-                    _trace_event(
-                        "initial_3d_render",
-                        f"Rendered {len(room_3d_views)} initial 3D views",
-                        duration_ms=round((time.time() - t_render) * 1000),
-                    )
-                )
-            except Exception as e:
-                logger.warning("Failed to render 3D views for initial placement: %s", e)
-                trace.append(
-                    _trace_event(
-                        "initial_3d_render_error",
-                        f"3D render failed: {e}",
-                        duration_ms=round((time.time() - t_render) * 1000),
-                    )
-                )
-            db.update_job(job_id, {"trace": trace})
+            room_3d_views = await scene_task
+        finally:
+            scene_task.cancel()  # no-op once finished; avoids an orphaned render on error
 
-        # Build image list: floorplan + 3D views + 2D diagram
+        # Build image list: floorplan + 3D views + 2D diagram. Encoded once and
+        # passed by reference to every placement call below.
         input_images: list[str] = []
         if floorplan_url:
             input_images.append(floorplan_url)
         input_images.extend(room_3d_views)
         input_images.append(room_diagram_url)
+        not_inline = [u for u in input_images if not u.startswith("data:")]
+        if not_inline:
+            logger.warning(
+                "Dropping %d placement images that are not inline data URLs: %s",
+                len(not_inline),
+                [u[:80] for u in not_inline],
+            )
+            input_images = [u for u in input_images if u.startswith("data:")]
 
-        # === Phase 1+2: Zone-based parallel placement ===
-        zone_placements = await _zone_placement_pipeline(
-            room,
-            furniture,
-            all_rooms,
-            input_images,
-            trace,
-            job_id,
-        )
+        # === Phase 2: Zone-based parallel placement ===
+        zone_placements = None
+        if decomposition is not None and decomposition.zones:
+            zone_placements = await _place_zones_given_decomposition(
+                decomposition,
+                room,
+                index,
+                all_rooms,
+                input_images,
+                trace,
+            )
 
         if zone_placements is not None:
             # Programmatically resolve overlaps/OOB from zone merge before verify loop
             zone_placements_raw = list(zone_placements)
-            zone_placements = auto_fix_placements(room, zone_placements, dims_map)
+            zone_placements = auto_fix_placements(room, zone_placements, index.dims)
             fix_count = sum(
                 1
                 for a, b in zip(zone_placements_raw, zone_placements)
@@ -611,29 +874,42 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
                     data={"fixed": fix_count, "total": len(zone_placements)},
                 )
             )
-            db.update_job(job_id, {"trace": trace})
-            result = PlacementResult(placements=zone_placements)
+            result = PlacementResult.model_construct(placements=zone_placements)
             logger.info("Using zone-based placement: %d items", len(result.placements))
         else:
             # Fallback to single-call placement
-            logger.info("Falling back to single-call placement")
-            trace.append(
-                _trace_event("fallback", "Zone pipeline failed, using single-call placement")
-            )
-            db.update_job(job_id, {"trace": trace})
+            if len(furniture) < ZONE_MIN_ITEMS:
+                reason = f"Only {len(furniture)} items, skipping zone decomposition"
+            else:
+                reason = "Zone pipeline failed"
+            logger.info("%s; using single-call placement", reason)
+            trace.append(_trace_event("fallback", f"{reason}, using single-call placement"))
             result = await _single_call_placement(
                 room,
                 furniture,
                 all_rooms,
                 input_images,
-                dims_map,
+                index.dims,
                 original_floorplan_url,
                 room_diagram_url,
                 trace,
-                job_id,
             )
 
         # === Phase 4: Combined Verify+Fix loop (single LLM call per iteration) ===
+        # Render tasks keyed by layout: reused if a fix leaves the layout unchanged,
+        # and started as soon as a fix is applied so the next iteration only awaits.
+        render_tasks: dict[tuple, asyncio.Task[list[str]]] = {}
+
+        def _start_render(placements: list[FurniturePlacement]) -> asyncio.Task[list[str]]:
+            key = _placements_key(placements)
+            task = render_tasks.get(key)
+            if task is None:
+                task = asyncio.create_task(
+                    _render_verify_views(room, room_glb_url, placements, furniture, all_rooms)
+                )
+                render_tasks[key] = task
+            return task
+
         for iteration in range(MAX_VERIFY_ITERATIONS):
             t0 = time.time()
             trace.append(
@@ -642,126 +918,121 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
                     f"Verify+fix iteration {iteration}: rendering views",
                 )
             )
-            db.update_job(job_id, {"trace": trace})
 
             try:
-                # 1. Render views
-                verify_images: list[str] = []
-                if room_glb_url:
-                    scene_urls = await render_scene_3d_views(
-                        room_glb_url,
-                        result.placements,
-                        furniture,
-                        all_rooms,
-                    )
-                    verify_images.extend(scene_urls)
-                diagram_url = render_placement_data_url(room, result.placements, furniture)
-                verify_images.append(diagram_url)
-
-                # 2. Single combined verify+fix call
-                vf_prompt = verify_and_fix_prompt(room, furniture, result.model_dump())
-                vf_raw = await call_gemini_with_images(vf_prompt, verify_images)
-                duration_ms = (time.time() - t0) * 1000
-
-                vf_json_str = _extract_json(vf_raw)
-                vf_data = json.loads(vf_json_str)
-
-                # 3. Parse evaluation
-                eval_data = vf_data.get("evaluation", {})
-                try:
-                    verification = PlacementVerificationResult.model_validate(eval_data)
-                except Exception:
-                    verification = PlacementVerificationResult(
-                        answers=[],
-                        visual_issues=[],
-                        overall_score=0.0,
-                        summary=eval_data.get("summary", "Parse error"),
-                    )
-
-                score = verification.overall_score
-                n_issues = len(verification.visual_issues)
-
-                trace.append(
-                    _trace_event(
-                        f"verify_fix_result_{iteration}",
-                        f"Score: {score:.2f}, {n_issues} issues",
-                        duration_ms=round(duration_ms),
-                        input_prompt=vf_prompt[:4000],
-                        output_text=vf_raw[:4000],
-                        model=GEMINI_MODEL,
-                        image_url=verify_images[0] if verify_images else None,
-                        input_images=verify_images,
-                        data={
-                            "score": score,
-                            "issues": n_issues,
-                            "iteration": iteration,
-                            "summary": verification.summary[:200],
-                        },
+                async with asyncio.timeout(VERIFY_TIMEOUT_S):
+                    # 1. Render views (usually already in flight from the previous fix)
+                    verify_images = await _start_render(result.placements)
+
+                    # 2. Single combined verify+fix call
+                    current_dump = result.model_dump(mode="json", exclude_none=True)
+                    vf_prompt = verify_and_fix_prompt(room, furniture, current_dump)
+                    vf_raw, vf_data = await _stream_verify_and_fix(vf_prompt, verify_images)
+                    duration_ms = (time.time() - t0) * 1000
+
+                    # 3. Parse evaluation
+                    eval_data = vf_data.get("evaluation", {})
+                    try:
+                        verification = PlacementVerificationResult.model_validate(eval_data)
+                    except Exception:
+                        verification = PlacementVerificationResult(
+                            answers=[],
+                            visual_issues=[],
+                            overall_score=0.0,
+                            summary=eval_data.get("summary", "Parse error"),
+                        )
+
+                    score = verification.overall_score
+                    n_issues = len(verification.visual_issues)
+
+                    trace.append(
+                        _trace_event(
+                            f"verify_fix_result_{iteration}",
+                            f"Score: {score:.2f}, {n_issues} issues",
+                            duration_ms=round(duration_ms),
+                            input_prompt=vf_prompt[:4000],
+                            output_text=vf_raw[:4000],
+                            model=GEMINI_MODEL,
+                            image_url=verify_images[0] if verify_images else None,
+                            input_images=verify_images,
+                            data={
+                                "score": score,
+                                "issues": n_issues,
+                                "iteration": iteration,
+                                "summary": verification.summary[:200],
+                            },
+                        )
                     )
-                )
-                db.update_job(job_id, {"trace": trace})
 
-                logger.info(
-                    "Verify+fix iteration %d: score=%.2f issues=%d",
-                    iteration,
-                    score,
-                    n_issues,
-                )
-
-                # 4. Check quality threshold
-                if score >= QUALITY_THRESHOLD:
                     logger.info(
-                        "Quality met at iteration %d (%.2f >= %.2f)",
+                        "Verify+fix iteration %d: score=%.2f issues=%d",
                         iteration,
                         score,
-                        QUALITY_THRESHOLD,
+                        n_issues,
                     )
-                    break
-
-                # 5. Apply fixed placements from the same response
-                if iteration < MAX_VERIFY_ITERATIONS - 1:
-                    new_placements = vf_data.get("placements", [])
-                    if new_placements:
-                        try:
-                            fixed = PlacementResult.model_validate({"placements": new_placements})
-                            if len(fixed.placements) >= len(result.placements) * 0.5:
-                                # Programmatically resolve any overlaps the LLM introduced
-                                fixed = PlacementResult(
-                                    placements=auto_fix_placements(
-                                        room,
-                                        fixed.placements,
-                                        dims_map,
-                                    )
+
+                    # 4. Check quality threshold
+                    if score >= QUALITY_THRESHOLD:
+                        logger.info(
+                            "Quality met at iteration %d (%.2f >= %.2f)",
+                            iteration,
+                            score,
+                            QUALITY_THRESHOLD,
+                        )
+                        break
+
+                    # 5. Apply fixed placements from the same response
+                    if iteration < MAX_VERIFY_ITERATIONS - 1:
+                        new_placements = vf_data.get("placements", [])
+                        if new_placements:
+                            try:
+                                fixed = PlacementResult.model_validate(
+                                    {"placements": new_placements}
                                 )
-                                result = fixed
-                                trace.append(
-                                    _trace_event(
-                                        f"auto_fix_iter_{iteration}",
-                                        f"Auto-fix iteration {iteration}: "
-                                        f"{len(result.placements)} items adjusted",
-                                        data={"items": len(result.placements)},
+                                if len(fixed.placements) >= len(result.placements) * 0.5:
+                                    # Programmatically resolve any overlaps the LLM introduced
+                                    fixed = PlacementResult.model_construct(
+                                        placements=auto_fix_placements(
+                                            room,
+                                            fixed.placements,
+                                            index.dims,
+                                        )
                                     )
-                                )
-                                db.update_job(job_id, {"trace": trace})
-                                logger.info(
-                                    "Fix applied from combined call: %d items",
-                                    len(result.placements),
-                                )
-                            else:
+                                    if _placements_key(fixed.placements) == _placements_key(
+                                        result.placements
+                                    ):
+                                        # Re-verifying the same layout would only repeat the score
+                                        logger.info("Combined fix left layout unchanged, stopping")
+                                        break
+                                    result = fixed
+                                    _start_render(result.placements)
+                                    trace.append(
+                                        _trace_event(
+                                            f"auto_fix_iter_{iteration}",
+                                            f"Auto-fix iteration {iteration}: "
+                                            f"{len(result.placements)} items adjusted",
+                                            data={"items": len(result.placements)},
+                                        )
+                                    )
+                                    logger.info(
+                                        "Fix applied from combined call: %d items",
+                                        len(result.placements),
+                                    )
+                                else:
+                                    logger.warning(
+                                        "Combined fix returned too few items (%d), keeping current",
+                                        len(fixed.placements),
+                                    )
+                                    break
+                            except Exception as parse_err:
                                 logger.warning(
-                                    "Combined fix returned too few items (%d), keeping current",
-                                    len(fixed.placements),
+                                    "Failed to parse fixed placements: %s",
+                                    parse_err,
                                 )
                                 break
-                        except Exception as parse_err:
-                            logger.warning(
-                                "Failed to parse fixed placements: %s",
-                                parse_err,
-                            )
+                        else:
+                            logger.warning("No placements in combined response, stopping loop")
                             break
-                    else:
-                        logger.warning("No placements in combined response, stopping loop")
-                        break
 
             except Exception as verify_err:
                 logger.warning("Verify+fix iteration %d failed: %s", iteration, verify_err)
@@ -772,12 +1043,18 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
                         duration_ms=round((time.time() - t0) * 1000),
                     )
                 )
-                db.update_job(job_id, {"trace": trace})
                 break
 
+        for task in render_tasks.values():
+            task.cancel()  # no-op once finished; drops a render nobody will await
+
         # Clamp all placements so items stay within room bounds
-        result = PlacementResult(placements=_clamp_placements(result.placements, room, dims_map))
+        result = PlacementResult.model_construct(
+            placements=_clamp_placements(result.placements, room, index)
+        )
 
+        # Dump once; the trace summary is read from the same dicts the session stores
+        result_dump = result.model_dump()
         trace.append(
             _trace_event(
                 "final_placements",
@@ -785,14 +1062,12 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
                 data={
                     "placements": [
                         {
-                            "name": p.name,
-                            "item_id": p.item_id,
-                            "x": p.position.x,
-                            "y": p.position.y,
-                            "z": p.position.z,
-                            "rotation": p.rotation_y_degrees,
+                            "name": p["name"],
+                            "item_id": p["item_id"],
+                            **p["position"],
+                            "rotation": p["rotation_y_degrees"],
                         }
-                        for p in result.placements
+                        for p in result_dump["placements"]
                     ],
                 },
             )
@@ -801,7 +1076,7 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
         db.update_session(
             session_id,
             {
-                "placements": result.model_dump(),
+                "placements": result_dump,
                 "status": "placement_ready",
             },
         )
@@ -813,7 +1088,7 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
                 data={"items_placed": len(result.placements)},
             )
         )
-        db.update_job(job_id, {"status": "completed", "trace": trace})
+        await trace.flush(status="completed")
 
         logger.info("Placement complete: session=%s items=%d", session_id, len(result.placements))
         return result
@@ -822,7 +1097,7 @@ async def place_furniture(session_id: str, job_id: str) -> PlacementResult:
         logger.error("Placement pipeline failed: %s", e, exc_info=True)
         trace.append(_trace_event("error", f"Placement failed: {e}", error=str(e)))
         try:
-            db.update_job(job_id, {"status": "failed", "trace": trace})
+            await trace.flush(status="failed")
             db.update_session(session_id, {"status": "placement_failed"})
         except Exception:
             pass
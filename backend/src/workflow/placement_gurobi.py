@@ -6,10 +6,16 @@ progress (colored image, furniture list, placement result).
 """
 
 import asyncio
+import copy
+import hashlib
 import json
 import logging
+import operator
+import os
 import tempfile
 import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import httpx
@@ -18,6 +24,57 @@ from .. import db
 
 logger = logging.getLogger(__name__)
 
+# IKEA search runs alongside constraint generation; don't let it stall the optimizer
+_IKEA_SEARCH_TIMEOUT_S = 180
+# Regenerate constraints if IKEA footprints differ from the estimates by more than this
+_CONSTRAINT_RERUN_DELTA = 0.25
+
+# Gurobi tuning: placements look the same well before optimality is proven.
+# The retry without distance constraints accepts a looser gap.
+_GUROBI_OPTIONS = {
+    "time_limit": 180,
+    "mip_gap": 0.05,
+    "presolve": 1,
+    "heuristics": 0.10,
+    "threads": min(8, os.cpu_count() or 1),
+    "lazy_distance": True,
+}
+_GUROBI_RETRY_MIP_GAP = 0.10
+# Budget for the whole solve + relaxation cascade; past it we fall back to greedy.
+# A retry with less than _GUROBI_MIN_SOLVE_S left is not worth starting.
+_GUROBI_DEADLINE_S = 360
+_GUROBI_MIN_SOLVE_S = 10
+
+# Spec fields persisted to the session as furniture_specs
+_SPEC_KEYS = ("name", "category", "length_m", "width_m", "height_m", "search_query", "priority")
+_SPEC_GET = operator.attrgetter(*_SPEC_KEYS)
+
+# Raw LLM output kept for the job trace is cut to this many characters
+_TRACE_TEXT_MAX = 3000
+
+# Concurrent furniture upserts (each is a blocking Supabase round-trip)
+_UPSERT_CONCURRENCY = 8
+
+# Grids built from colored floorplans, keyed by session + image digest (LRU)
+_GRID_CACHE: OrderedDict = OrderedDict()
+_GRID_CACHE_MAX = 32
+
+# Binary renders of room GLBs (PNG bytes), keyed by GLB digest + resolution (LRU)
+_RENDER_CACHE: OrderedDict = OrderedDict()
+_RENDER_CACHE_MAX = 16
+
+# Built Gurobi models, reused when a run repeats the same grid/specs/constraints
+_model_cache = None
+
+
+def _get_model_cache():
+    global _model_cache
+    if _model_cache is None:
+        from ..furniture_placement.opt_cache import OptimizationCache
+
+        _model_cache = OptimizationCache()
+    return _model_cache
+
 # Nano Banana prompt (matches pipeline.py)
 _NANO_BANANA_PROMPT = (
     "This is a floor plan. Fill each individual/distinct room with a different "
@@ -27,11 +84,86 @@ _NANO_BANANA_PROMPT = (
 )
 
 
-async def _download_floorplan(url: str, dest: Path) -> Path:
+def _previous_grid_placements(session: dict, grid) -> list:
+    """Recover the last run's grid placements from the session for a MIP warm start.
+
+    Only used when the previous run produced a grid of the same size; the
+    Gemini placement path stores no room_name/size_m, so its results are skipped.
+    """
+    from ..furniture_placement.coord_convert import grid_from_3d
+
+    prev_grid = session.get("grid_data") or {}
+    if (prev_grid.get("width"), prev_grid.get("height"), prev_grid.get("cell_size")) != (
+        grid.width, grid.height, grid.cell_size
+    ):
+        return []
+    prev = (session.get("placements") or {}).get("placements") or []
+    recovered = (grid_from_3d(c, grid) for c in prev if c.get("room_name") and c.get("size_m"))
+    return [p for p in recovered if p is not None]
+
+
+def _ms_since(t0_ns: int) -> int:
+    """Milliseconds elapsed since a time.perf_counter_ns() reading."""
+    return (time.perf_counter_ns() - t0_ns) // 1_000_000
+
+
+def _grid_cache_key(session_id: str, colored_bytes: bytes, width_m: float, cell_size: float) -> str:
+    digest = hashlib.blake2b(colored_bytes, digest_size=8).hexdigest()
+    return f"{session_id}:{digest}:{width_m}:{cell_size}"
+
+
+async def _build_grid_cached(session_id: str, colored_bytes: bytes,
+                             width_m: float, cell_size: float):
+    """Build the placement grid, reusing it when the colored image is unchanged.
+
+    The CV grid build is pure in the image, so an identical colored floorplan
+    (e.g. a re-run served from the image model's cache) gives the same grid.
+    """
+    from ..furniture_placement.pipeline import build_grid_from_colored_bytes
+
+    key = _grid_cache_key(session_id, colored_bytes, width_m, cell_size)
+    grid = _GRID_CACHE.get(key)
+    if grid is not None:
+        _GRID_CACHE.move_to_end(key)
+        logger.info("Reusing cached grid for session %s", session_id)
+        return grid
+    grid = await asyncio.to_thread(build_grid_from_colored_bytes, colored_bytes, width_m, cell_size)
+    _GRID_CACHE[key] = grid
+    if len(_GRID_CACHE) > _GRID_CACHE_MAX:
+        _GRID_CACHE.popitem(last=False)
+    return grid
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+
+
+async def _render_binary_cached(glb_path: str, resolution: int = 1024) -> bytes:
+    """Render a GLB to binary floorplan PNG bytes, reusing them for identical GLB bytes.
+
+    The render is deterministic in the GLB and resolution, so retries and
+    repeated demo floorplans skip the rasterization.
+    """
+    # Room GLBs run to tens of MB; read and hash them off the event loop
+    digest = await asyncio.to_thread(_file_digest, glb_path)
+    key = f"{digest}:{resolution}"
+    png = _RENDER_CACHE.get(key)
+    if png is not None:
+        _RENDER_CACHE.move_to_end(key)
+        logger.info("Reusing cached binary render %s", digest[:8])
+    else:
+        png = await asyncio.to_thread(_render_glb_to_png, glb_path, resolution)
+        _RENDER_CACHE[key] = png
+        if len(_RENDER_CACHE) > _RENDER_CACHE_MAX:
+            _RENDER_CACHE.popitem(last=False)
+    return png
+
+
+async def _download_floorplan(client: httpx.AsyncClient, url: str, dest: Path) -> Path:
     """Download floorplan image from URL to a local file."""
-    async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
+    resp = await client.get(url, timeout=30)
+    resp.raise_for_status()
     dest.write_bytes(resp.content)
     logger.info("Downloaded floorplan (%d bytes) → %s", len(resp.content), dest)
     return dest
@@ -51,16 +183,54 @@ async def _generate_room_glb(floorplan_path: str, session_id: str) -> str:
     return glb_url
 
 
-def _render_glb_to_binary(glb_path: str, output_path: str, resolution: int = 1024) -> str:
-    """Render a GLB to a top-down binary floorplan image using trimesh + OpenCV.
+_GPU_BATCH_PIXELS = 1 << 24
 
-    Replicates Misha's Blender pipeline: load GLB → orthographic top-down
-    depth render → threshold to get black walls on white background.
 
-    Uses vectorized numpy + OpenCV fillPoly for fast rasterization.
+def _rasterize_interiors_cuda(tris, depths, h: int, w: int, device: str = "cuda"):
+    """Max-composite triangle interiors into an (h, w) uint8 depth map on the GPU.
+
+    A pixel is covered when it lies on or inside all three edges, which is
+    cv2.fillPoly's coverage minus the outline (drawn by the caller). Triangles
+    are bucketed by bounding-box size so each batch tests a fixed tile.
+    Returns None when torch or a CUDA device is unavailable.
     """
-    import cv2
+    try:
+        import torch
+    except ImportError:
+        return None
+    if device == "cuda" and not torch.cuda.is_available():
+        return None
     import numpy as np
+
+    zbuf = torch.zeros(h * w, dtype=torch.int32, device=device)
+    t_all = torch.from_numpy(np.ascontiguousarray(tris)).to(device)
+    d_all = torch.from_numpy(depths.astype(np.int32)).to(device)
+    lo_all = t_all.amin(dim=1)
+    span = (t_all.amax(dim=1) - lo_all).amax(dim=1)
+
+    max_span = int(span.max()) if len(span) else -1
+    lower, tile = -1, 4
+    while lower < max_span:
+        batch = torch.nonzero((span > lower) & (span < tile)).squeeze(1)
+        off = torch.arange(tile, device=device, dtype=torch.int32)
+        for chunk in batch.split(max(1, _GPU_BATCH_PIXELS // (tile * tile))):
+            t = t_all[chunk][:, :, :, None, None]  # (n, 3, 2, 1, 1)
+            xs = lo_all[chunk, 0, None, None] + off[None, None, :]
+            ys = lo_all[chunk, 1, None, None] + off[None, :, None]
+            x0, y0, x1, y1, x2, y2 = (t[:, v, c] for v in range(3) for c in range(2))
+            e0 = (x1 - x0) * (ys - y0) - (y1 - y0) * (xs - x0)
+            e1 = (x2 - x1) * (ys - y1) - (y2 - y1) * (xs - x1)
+            e2 = (x0 - x2) * (ys - y2) - (y0 - y2) * (xs - x2)
+            inside = ((e0 >= 0) & (e1 >= 0) & (e2 >= 0)) | ((e0 <= 0) & (e1 <= 0) & (e2 <= 0))
+            inside &= (xs < w) & (ys < h)
+            d = d_all[chunk, None, None].expand_as(inside)
+            zbuf.scatter_reduce_(0, (ys * w + xs)[inside].long(), d[inside], reduce="amax")
+        lower, tile = tile - 1, tile * 2
+    return zbuf.view(h, w).to(torch.uint8).cpu().numpy()
+
+
+def _load_glb_mesh(glb_path: str):
+    """Load a GLB and flatten its scene into a single trimesh.Trimesh."""
     import trimesh
 
     scene = trimesh.load(glb_path)
@@ -69,18 +239,36 @@ def _render_glb_to_binary(glb_path: str, output_path: str, resolution: int = 102
         meshes = list(scene.dump())
         if not meshes:
             raise ValueError("GLB contains no geometry")
-        mesh = trimesh.util.concatenate(meshes)
-    else:
-        mesh = scene
+        return trimesh.util.concatenate(meshes)
+    return scene
+
 
+def _import_render_deps() -> None:
+    """Import trimesh (which pulls in scipy) so the first render doesn't pay for it."""
+    import trimesh  # noqa: F401
+
+
+def _render_glb_to_png(glb_path: str, resolution: int = 1024) -> bytes:
+    """Render a GLB to a top-down binary floorplan image using trimesh + OpenCV.
+
+    Replicates Misha's Blender pipeline: load GLB → orthographic top-down
+    depth render → threshold to get black walls on white background.
+
+    Uses vectorized numpy + OpenCV fillPoly for fast rasterization. The PNG is
+    encoded in memory and returned as bytes.
+    """
+    import cv2
+    import numpy as np
+
+    mesh = _load_glb_mesh(glb_path)
     bounds = mesh.bounds
     extent = bounds[1] - bounds[0]
 
     # Clip at 75% height (remove ceiling), matching Misha's --clip-height 75.0
     clip_y = bounds[0][1] + 0.75 * extent[1]
 
-    verts = mesh.vertices
-    faces = mesh.faces
+    verts = np.ascontiguousarray(mesh.vertices, dtype=np.float32)
+    faces = np.ascontiguousarray(mesh.faces, dtype=np.int32)
 
     # Filter faces: keep those with at least one vertex below clip height
     face_verts_y = verts[faces, 1]  # (N_faces, 3) — Y coord per vertex
@@ -99,71 +287,325 @@ def _render_glb_to_binary(glb_path: str, output_path: str, resolution: int = 102
     w = resolution
     h = max(1, int(resolution * aspect))
 
-    # Project all vertices to pixel coords (XZ plane → image)
-    px_all = ((verts[:, 0] - x_min) / x_range * (w - 1)).astype(np.int32)
-    py_all = ((verts[:, 2] - z_min) / z_range * (h - 1)).astype(np.int32)
-    px_all = np.clip(px_all, 0, w - 1)
-    py_all = np.clip(py_all, 0, h - 1)
+    # Project all vertices to (V, 2) pixel coords (XZ plane → image), once per
+    # vertex; faces then gather their corners in a single indexing pass
+    pix = np.empty((len(verts), 2), dtype=np.int32)
+    pix[:, 0] = np.clip((verts[:, 0] - x_min) / x_range * (w - 1), 0, w - 1)
+    pix[:, 1] = np.clip((verts[:, 2] - z_min) / z_range * (h - 1), 0, h - 1)
 
     # Per-face minimum Y (height) as the "depth" value for that triangle
-    face_min_y = np.min(verts[kept_faces, 1], axis=1)
-
-    # Rasterize with OpenCV fillPoly: paint each triangle with its depth index
-    # Sort faces by depth (tallest = lowest Y first) so shorter structures overwrite
-    depth_order = np.argsort(face_min_y)
+    face_min_y = face_verts_y[face_mask].min(axis=1)
 
     # Quantize depths into 256 levels for an 8-bit depth buffer
     if len(face_min_y) == 0:
-        cv2.imwrite(output_path, np.ones((h, w), dtype=np.uint8) * 255)
-        return output_path
+        return cv2.imencode(".png", np.full((h, w), 255, dtype=np.uint8))[1].tobytes()
 
     y_min, y_max = face_min_y.min(), face_min_y.max()
     y_range = y_max - y_min if (y_max - y_min) > 1e-6 else 1.0
     depth_vals = ((face_min_y - y_min) / y_range * 254).astype(np.uint8) + 1  # 1..255
 
-    # Paint depth map: background = 0, geometry = 1..255
-    depth_map = np.zeros((h, w), dtype=np.uint8)
-    for idx in depth_order:
-        f = kept_faces[idx]
-        pts = np.array([[px_all[f[0]], py_all[f[0]]],
-                         [px_all[f[1]], py_all[f[1]]],
-                         [px_all[f[2]], py_all[f[2]]]], dtype=np.int32)
-        cv2.fillPoly(depth_map, [pts], int(depth_vals[idx]))
-
-    # Threshold: walls are the tallest structures (lowest Y = lowest depth_val)
-    has_geometry = depth_map > 0
-    if not np.any(has_geometry):
-        binary = np.ones((h, w), dtype=np.uint8) * 255
+    # Rasterize with OpenCV fillPoly: paint each triangle with its depth index.
+    # Sort faces by depth (tallest = lowest Y first) so shorter structures
+    # overwrite; a stable sort on the uint8 depths is a radix sort.
+    # Each triangle is filled separately: a single fillPoly over many polygons
+    # uses even-odd filling, which punches holes where triangles overlap.
+    depth_order = np.argsort(depth_vals, kind="stable")
+    tris = pix[kept_faces[depth_order]]
+    tri_depths = depth_vals[depth_order]
+
+    # Faces that project onto the same pixel triangle (coplanar or stacked
+    # geometry, sub-pixel faces) paint the same pixels, so only the last one
+    # in paint order, which has the highest depth, is kept.
+    corners = np.sort(tris[..., 1].astype(np.int64) * w + tris[..., 0], axis=1)
+    by_corners = np.lexsort(corners.T[::-1])
+    grouped = corners[by_corners]
+    last = np.ones(len(grouped), dtype=bool)
+    last[:-1] = np.any(grouped[1:] != grouped[:-1], axis=1)
+    unique = np.sort(by_corners[last])
+    tris, tri_depths = tris[unique], tri_depths[unique]
+
+    # Edge-on faces (walls seen from above) project to zero-area triangles,
+    # i.e. line segments. polylines draws every polyline in a list separately,
+    # so these are drawn with one call per depth level instead of one per face.
+    e1 = tris[:, 1] - tris[:, 0]
+    e2 = tris[:, 2] - tris[:, 0]
+    flat = e1[:, 0] * e2[:, 1] == e1[:, 1] * e2[:, 0]
+
+    # Paint depth map: background = 0, geometry = 1..255. Faces are painted in
+    # ascending depth, so each pixel ends up with the max depth covering it.
+    depth_map = _rasterize_interiors_cuda(tris[~flat], tri_depths[~flat], h, w)
+    if depth_map is None:
+        depth_map = np.zeros((h, w), dtype=np.uint8)
+        for tri, d in zip(tris[~flat], tri_depths[~flat].tolist()):
+            cv2.fillPoly(depth_map, [tri], d)
+        outlined = flat
     else:
-        # Wall threshold at 25% of the depth range (shortest structures)
-        wall_thresh = int(0.25 * 254) + 1
-        binary = np.ones((h, w), dtype=np.uint8) * 255  # white background
-        binary[(depth_map > 0) & (depth_map <= wall_thresh)] = 0  # black walls
-
-    # Morphological cleanup
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-    inverted = 255 - binary
-    inverted = cv2.morphologyEx(inverted, cv2.MORPH_CLOSE, kernel, iterations=2)
-    inverted = cv2.morphologyEx(inverted, cv2.MORPH_OPEN, kernel, iterations=1)
-    binary = 255 - inverted
-
-    cv2.imwrite(output_path, binary)
-    logger.info("Binary floorplan rendered: %s (%dx%d)", output_path, w, h)
-    return output_path
-
-
-async def _download_glb(url: str, dest: Path) -> Path:
+        # The GPU pass fills interiors only; fillPoly also draws the outline.
+        outlined = np.ones_like(flat)
+
+    # Both passes are max-composites, so they can be merged with a max.
+    line_map = np.zeros_like(depth_map)
+    flat_tris, flat_depths = tris[outlined], tri_depths[outlined]
+    splits = np.flatnonzero(np.diff(flat_depths)) + 1
+    for group in np.split(np.arange(len(flat_tris)), splits):
+        if len(group):
+            cv2.polylines(line_map, list(flat_tris[group]), True, int(flat_depths[group[0]]))
+    np.maximum(depth_map, line_map, out=depth_map)
+
+    # Threshold: walls are the tallest structures (lowest Y = lowest depth_val).
+    # Wall threshold at 25% of the depth range (shortest structures)
+    wall_thresh = int(0.25 * 254) + 1
+    walls = cv2.inRange(depth_map, 1, wall_thresh)  # 255 on walls
+
+    # Morphological cleanup of the walls: close with a 3x3 square (2 iterations),
+    # then open (1 iteration). Square dilations and erosions compose into larger
+    # squares, so dilate 3x3 x2, erode 3x3 x3, dilate 3x3 is three passes.
+    cv2.dilate(walls, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5)), dst=walls)
+    cv2.erode(walls, cv2.getStructuringElement(cv2.MORPH_RECT, (7, 7)), dst=walls)
+    cv2.dilate(walls, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)), dst=walls)
+    binary = cv2.bitwise_not(walls)  # black walls on white background
+
+    png = cv2.imencode(".png", binary)[1].tobytes()
+    logger.info("Binary floorplan rendered: %s (%dx%d)", glb_path, w, h)
+    return png
+
+
+async def _download_glb(client: httpx.AsyncClient, url: str, dest: Path) -> Path:
     """Download a GLB file from URL."""
-    async with httpx.AsyncClient(timeout=60, follow_redirects=True) as client:
-        resp = await client.get(url)
-        resp.raise_for_status()
+    resp = await client.get(url, timeout=60)
+    resp.raise_for_status()
     dest.write_bytes(resp.content)
     logger.info("Downloaded GLB (%d bytes) → %s", len(resp.content), dest)
     return dest
 
 
-def _trace(*events: dict) -> list[dict]:
-    return list(events)
+@dataclass
+class SessionCtx:
+    """Per-run handle on the session and job: one read, writes batched per phase.
+
+    Trace steps and session data accumulate locally; flush() writes the
+    pending session fields (if any) and then the job with its full trace.
+    Status changes and write_session() go out at once, since the frontend
+    polls the session for them.
+    """
+
+    session_id: str
+    job_id: str
+    session: dict = field(default_factory=dict)
+    trace: list[dict] = field(default_factory=list)
+    pending_session: dict = field(default_factory=dict)
+
+    def load(self) -> dict:
+        session = db.get_session(self.session_id)
+        if not session:
+            raise ValueError(f"Session {self.session_id} not found")
+        self.session = session
+        return session
+
+    @property
+    def preferences(self) -> dict:
+        return self.session.get("preferences") or {}
+
+    def emit(self, step: str, **fields) -> None:
+        """Record a trace step, updating the existing entry if the step was already started."""
+        for event in self.trace:
+            if event["step"] == step:
+                event.update(fields)
+                return
+        self.trace.append({"step": step, **fields})
+
+    def set_status(self, status: str) -> None:
+        self.write_session({"status": status})
+
+    def update_session(self, updates: dict) -> None:
+        self.pending_session.update(updates)
+
+    def write_session(self, updates: dict) -> None:
+        """Write `updates` (with any pending session fields) to the session now."""
+        db.update_session(self.session_id, {**self.pending_session, **updates})
+        self.pending_session = {}
+
+    def flush(self, **job_updates) -> None:
+        if self.pending_session:
+            db.update_session(self.session_id, self.pending_session)
+            self.pending_session = {}
+        db.update_job(self.job_id, {**job_updates, "trace": list(self.trace)})
+
+
+def _to_api(coord: dict, ikea_data: dict) -> dict:
+    """API placement for a 3D coordinate, enriched with its IKEA match (if any)."""
+    return {
+        "item_id": ikea_data.get("ikea_item_code") or coord["name"],
+        "name": coord["name"],
+        "position": coord["position"],
+        "rotation_y_degrees": coord["rotation_y_degrees"],
+        "room_name": coord["room_name"],
+        "size_m": coord["size_m"],
+        "grid": coord["grid"],
+        "glb_url": ikea_data.get("glb_url", ""),
+        "image_url": ikea_data.get("image_url", ""),
+        "buy_url": ikea_data.get("buy_url", ""),
+        "ikea_item_code": ikea_data.get("ikea_item_code", ""),
+        "ikea_name": ikea_data.get("ikea_name", ""),
+        "price": ikea_data.get("price"),
+        "currency": ikea_data.get("currency", ""),
+        "reasoning": f"Gurobi-optimized placement in {coord['room_name']}",
+    }
+
+
+def _build_payload(session_id: str, p: dict) -> dict:
+    """Furniture row for a final API placement."""
+    sm = p.get("size_m") or {}
+    return {
+        "id": p.get("item_id") or p["name"],
+        "session_id": session_id,
+        "retailer": "ikea" if p.get("buy_url") else "generated",
+        "name": p.get("ikea_name") or p["name"],
+        "price": p.get("price") or 0,
+        "currency": p.get("currency") or "EUR",
+        "image_url": p.get("image_url", ""),
+        "product_url": p.get("buy_url", ""),
+        "glb_url": p.get("glb_url", ""),
+        "category": p.get("room_name", ""),
+        "dimensions": {
+            "width_cm": sm.get("width", 0) * 100,
+            "depth_cm": sm.get("depth", sm.get("length", 0)) * 100,
+            "height_cm": sm.get("height", 0) * 100,
+        },
+        "selected": True,
+    }
+
+
+async def _upsert_furniture_all(payloads: list[dict]) -> None:
+    """Upsert furniture rows in one batched request.
+
+    Rows sharing an id (e.g. two items matched to the same IKEA product) are
+    collapsed to the last one, as sequential upserts would leave it. If the
+    batch fails, rows are upserted concurrently one by one so a single bad
+    row doesn't drop the rest; those failures are logged and skipped.
+    """
+    payloads = list({p["id"]: p for p in payloads}.values())
+    if not payloads:
+        return
+    try:
+        await asyncio.to_thread(db.upsert_furniture_many, payloads)
+        return
+    except Exception as e:
+        logger.warning("Batch furniture upsert failed (%s), retrying row by row", e)
+
+    sem = asyncio.Semaphore(_UPSERT_CONCURRENCY)
+
+    async def _up(payload: dict) -> None:
+        async with sem:
+            await asyncio.to_thread(db.upsert_furniture, payload)
+
+    results = await asyncio.gather(*(_up(p) for p in payloads), return_exceptions=True)
+    for payload, result in zip(payloads, results):
+        if isinstance(result, Exception):
+            logger.debug("Failed to upsert furniture item %s: %s", payload["id"], result)
+
+
+def _clear_constraints(field_name: str):
+    def relax(opt_furniture: dict, opt_constraints: dict, specs: dict) -> None:
+        for c in opt_constraints.values():
+            setattr(c, field_name, [])
+    return relax
+
+
+def _drop_low_priority(opt_furniture: dict, opt_constraints: dict, specs: dict) -> None:
+    """Remove nice-to-have items (and any constraints naming them) from the optimizer input."""
+    for room_name, items in specs.items():
+        optional = {i.name for i in items if i.priority != "essential"}
+        if not optional:
+            continue
+        opt_furniture[room_name] = [
+            f for f in opt_furniture.get(room_name, []) if f.name not in optional
+        ]
+        c = opt_constraints.get(room_name)
+        if c is None:
+            continue
+        c.boundary_items = [n for n in c.boundary_items if n not in optional]
+        c.distance_constraints = [
+            d for d in c.distance_constraints if d[0] not in optional and d[1] not in optional
+        ]
+        c.alignment_constraints = [
+            [n for n in group if n not in optional] for group in c.alignment_constraints
+        ]
+        c.facing_constraints = [
+            pair for pair in c.facing_constraints if not optional.intersection(pair)
+        ]
+
+
+# Applied cumulatively, in order, until the optimizer finds a placement
+_RELAX_STEPS = (
+    ("distance", _clear_constraints("distance_constraints")),
+    ("facing", _clear_constraints("facing_constraints")),
+    ("alignment", _clear_constraints("alignment_constraints")),
+    ("boundary", _clear_constraints("boundary_items")),
+    ("priority", _drop_low_priority),
+)
+
+
+async def _optimize(model, warm_start: list) -> list:
+    # An infeasible LP relaxation means the MIP is infeasible too, so skip it.
+    # The LP solution only seeds a start if the session gave none.
+    if await asyncio.to_thread(model.solve_lp_relaxation, not warm_start):
+        return await asyncio.to_thread(model.optimize)
+    return []
+
+
+def _solve_time_limit(time_limit: float, deadline: float | None) -> float:
+    """Gurobi time limit for the next solve, capped by a time.monotonic() deadline."""
+    if deadline is None:
+        return time_limit
+    return max(0.0, min(time_limit, deadline - time.monotonic()))
+
+
+async def _solve_placement(grid, opt_furniture: dict, opt_constraints: dict,
+                           warm_start: list, drop_distance_on_failure: bool = False,
+                           deadline: float | None = None, **options) -> tuple[list, bool]:
+    """Build (or reuse) a placement model and solve it.
+
+    With drop_distance_on_failure, a failed solve is retried on the same model
+    with its distance rows removed in place rather than rebuilding it.
+    Every solve is capped by `deadline` (time.monotonic()); the cap is set on
+    the model, not passed as an option, so it does not change the cache key.
+    Returns (placements, distance_dropped); placements is [] if no solution.
+    """
+    model_cache = _get_model_cache()
+    # Building the model (variables + constraints) is CPU-bound too, so keep it off the loop
+    model_key, model = await asyncio.to_thread(
+        model_cache.get_or_build, grid, opt_furniture, opt_constraints, **options,
+    )
+    if warm_start:
+        matched = model.set_start(warm_start)
+        logger.info("Warm-starting Gurobi with %d placements", matched)
+    time_limit = options.get("time_limit", _GUROBI_OPTIONS["time_limit"])
+    model.model.Params.TimeLimit = _solve_time_limit(time_limit, deadline)
+    placements = await _optimize(model, warm_start)
+    if placements or not (drop_distance_on_failure and model.distance_constrs):
+        # Only a model whose solve finished goes back; a cancelled one may still be running
+        model_cache.release(model_key, model)
+        return placements, False
+
+    logger.warning("No solution, applying relaxation: distance (in place)")
+    model.drop_distance_constraints()
+    model.model.Params.MIPGap = _GUROBI_RETRY_MIP_GAP
+    model.model.Params.TimeLimit = _solve_time_limit(time_limit, deadline)
+    placements = await _optimize(model, warm_start)
+    # The edited model no longer matches its cache key, so it is not returned to the cache
+    model.model.dispose()
+    return placements, True
+
+
+def _footprints_changed(before: dict, after: dict, tolerance: float) -> bool:
+    """True if any spec's length/width moved by more than `tolerance` (relative)."""
+    for room_name, items in after.items():
+        for old, new in zip(before.get(room_name, []), items):
+            for a, b in ((old.length_m, new.length_m), (old.width_m, new.width_m)):
+                if a > 0 and abs(b - a) / a > tolerance:
+                    return True
+    return False
 
 
 async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
@@ -176,23 +618,28 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
     3. Build grid from colored image
     4. Claude furniture specs
     5. IKEA product search → save furniture items
-    6. Claude constraints
+    6. Claude constraints (generated while the IKEA search runs)
     7. Gurobi optimizer
     8. 3D coordinate conversion + Trellis models
     9. Save results back to session
+
+    Session and job writes are batched per phase through a SessionCtx.
     """
-    try:
-        db.update_job(job_id, {"status": "running", "trace": [{"step": "started"}]})
+    ctx = SessionCtx(session_id, job_id)
+    # One connection pool for every download of the run
+    http = httpx.AsyncClient(
+        timeout=60, follow_redirects=True,
+        limits=httpx.Limits(max_keepalive_connections=16),
+    )
 
-        session = db.get_session(session_id)
-        if not session:
-            raise ValueError(f"Session {session_id} not found")
+    try:
+        session = ctx.load()
 
         floorplan_url = session.get("floorplan_url")
         if not floorplan_url:
             raise ValueError(f"Session {session_id} has no floorplan_url")
 
-        prefs = session.get("preferences") or {}
+        prefs = ctx.preferences
         style = prefs.get("style", "modern scandinavian")
         budget = prefs.get("budget_max", 5000)
 
@@ -200,65 +647,63 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
             tmp = Path(tmpdir)
 
             # --- Step 0: Download floorplan ---
-            db.update_session(session_id, {"status": "analyzing_floorplan"})
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started"},
-                {"step": "downloading_floorplan", "message": "Downloading floorplan"},
-            )})
+            ctx.set_status("analyzing_floorplan")
+            ctx.emit("started", duration_ms=1)
+            ctx.emit("downloading_floorplan", message="Downloading floorplan")
+            ctx.flush(status="running")
 
             ext = floorplan_url.rsplit(".", 1)[-1].split("?")[0] if "." in floorplan_url else "png"
             floorplan_path = tmp / f"floorplan.{ext}"
-            await _download_floorplan(floorplan_url, floorplan_path)
+            await _download_floorplan(http, floorplan_url, floorplan_path)
 
             # --- Step 1: Generate room GLB via Trellis 2 ---
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started"},
-                {"step": "downloading_floorplan", "duration_ms": 1},
-                {"step": "trellis_room", "message": "Generating 3D room model (Trellis 2)",
-                 "input_image": floorplan_url, "model": "fal-ai/trellis-2"},
-            )})
-
-            t0 = time.time()
-            room_glb_url = await _generate_room_glb(str(floorplan_path), session_id)
-            trellis_room_ms = round((time.time() - t0) * 1000)
+            ctx.emit("downloading_floorplan", message="Floorplan downloaded", duration_ms=1)
+            ctx.emit("trellis_room", message="Generating 3D room model (Trellis 2)",
+                     input_image=floorplan_url, model="fal-ai/trellis-2")
+
+            # The renderer's imports take a couple of seconds cold; load them
+            # on a worker thread while Trellis generates the room
+            render_deps = asyncio.create_task(asyncio.to_thread(_import_render_deps))
+            t0 = time.perf_counter_ns()
+            try:
+                room_glb_url = await _generate_room_glb(str(floorplan_path), session_id)
+            finally:
+                await render_deps
+            trellis_room_ms = _ms_since(t0)
 
-            # Save room GLB URL to session
-            db.update_session(session_id, {"room_glb_url": room_glb_url})
+            # Save room GLB URL to session so the viewer can load it right away
+            ctx.write_session({"room_glb_url": room_glb_url})
 
             # --- Step 1b: Render GLB → binary floorplan ---
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "downloading_floorplan", "duration_ms": 1},
-                {"step": "trellis_room", "message": "Room GLB generated", "duration_ms": trellis_room_ms,
-                 "input_image": floorplan_url, "model": "fal-ai/trellis-2"},
-                {"step": "render_binary", "message": "Rendering GLB to binary floorplan"},
-            )})
-
-            t0 = time.time()
+            ctx.emit("trellis_room", message="Room GLB generated", duration_ms=trellis_room_ms)
+
+            t0 = time.perf_counter_ns()
             glb_local = tmp / "room.glb"
-            await _download_glb(room_glb_url, glb_local)
-            binary_path = str(tmp / "binary_floorplan.png")
-            await asyncio.to_thread(_render_glb_to_binary, str(glb_local), binary_path)
-            render_ms = round((time.time() - t0) * 1000)
-
-            # Upload binary image for trace display
-            binary_bytes = Path(binary_path).read_bytes()
-            binary_url = db.upload_to_storage(
-                "floorplans", f"{session_id}/binary.png", binary_bytes, "image/png",
-            )
+            await _download_glb(http, room_glb_url, glb_local)
+            binary_bytes = await _render_binary_cached(str(glb_local))
+            render_ms = _ms_since(t0)
+
+            from ..furniture_placement.pipeline import _color_rooms_bytes, _make_llm_caller
 
             # --- Step 2: Nano Banana coloring on the CLEAN binary image ---
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "trellis_room", "duration_ms": trellis_room_ms,
-                 "input_image": floorplan_url, "model": "fal-ai/trellis-2"},
-                {"step": "render_binary", "message": "Binary floorplan ready", "duration_ms": render_ms,
-                 "image_url": binary_url},
-                {"step": "nano_banana", "message": "Coloring rooms with Nano Banana",
-                 "input_image": binary_url,
-                 "input_prompt": _NANO_BANANA_PROMPT,
-                 "model": "google/gemini-3-pro-image-preview"},
-            )})
+            # Coloring starts while the binary image is uploaded for trace display
+            t0 = time.perf_counter_ns()
+            nano_task = asyncio.create_task(_color_rooms_bytes(binary_bytes))
+            try:
+                binary_url = await asyncio.to_thread(
+                    db.upload_to_storage,
+                    "floorplans", f"{session_id}/binary.png", binary_bytes, "image/png",
+                )
+                ctx.emit("render_binary", message="Binary floorplan ready",
+                         duration_ms=render_ms, image_url=binary_url)
+                ctx.emit("nano_banana", message="Coloring rooms with Nano Banana",
+                         input_image=binary_url,
+                         input_prompt=_NANO_BANANA_PROMPT,
+                         model="google/gemini-3-pro-image-preview")
+                ctx.flush()
+            except BaseException:
+                nano_task.cancel()
+                raise
 
             from ..furniture_placement.furniture_agents import (
                 _CONSTRAINT_PROMPT,
@@ -275,38 +720,23 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
                 specs_to_search_queries,
                 update_specs_from_search_results,
             )
-            from ..furniture_placement.pipeline import (
-                _color_rooms_with_nano_banana,
-                _make_llm_caller,
-                build_grid_from_colored_image,
-            )
+            colored_bytes = await nano_task
+            nano_ms = _ms_since(t0)
 
-            t0 = time.time()
-            colored_path = str(tmp / "colored.png")
-            await _color_rooms_with_nano_banana(binary_path, colored_path)
-            nano_ms = round((time.time() - t0) * 1000)
-
-            # Upload colored image so the frontend can show it
-            colored_bytes = Path(colored_path).read_bytes()
-            colored_url = db.upload_to_storage(
-                "floorplans", f"{session_id}/colored.png", colored_bytes, "image/png",
+            # --- Step 3: Build grid (CPU-bound, run in thread) ---
+            # The colored image is uploaded for the frontend at the same time
+            t0 = time.perf_counter_ns()
+            grid, colored_url = await asyncio.gather(
+                _build_grid_cached(session_id, colored_bytes, 12.0, 0.25),
+                asyncio.to_thread(
+                    db.upload_to_storage,
+                    "floorplans", f"{session_id}/colored.png", colored_bytes, "image/png",
+                ),
             )
+            grid_ms = _ms_since(t0)
 
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "trellis_room", "duration_ms": trellis_room_ms, "model": "fal-ai/trellis-2"},
-                {"step": "render_binary", "duration_ms": render_ms, "image_url": binary_url},
-                {"step": "nano_banana", "message": "Rooms colored", "duration_ms": nano_ms,
-                 "input_image": binary_url, "image_url": colored_url,
-                 "input_prompt": _NANO_BANANA_PROMPT,
-                 "model": "google/gemini-3-pro-image-preview"},
-                {"step": "grid_building", "message": "Building placement grid"},
-            )})
-
-            # --- Step 3: Build grid (CPU-bound, run in thread) ---
-            t0 = time.time()
-            grid = await asyncio.to_thread(build_grid_from_colored_image, colored_path, 12.0, 0.25)
-            grid_ms = round((time.time() - t0) * 1000)
+            ctx.emit("nano_banana", message="Rooms colored", duration_ms=nano_ms,
+                     image_url=colored_url)
 
             room_summary = ", ".join(
                 f"{n} ({grid.room_area_sqm(n):.0f}m²)" for n in grid.room_names
@@ -326,18 +756,15 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
                 room_info=room_info, preferences_info=pref_info,
             )
 
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "nano_banana", "duration_ms": nano_ms, "image_url": colored_url,
-                 "input_image": binary_url, "model": "google/gemini-3-pro-image-preview"},
-                {"step": "grid_ready", "message": f"{grid.width}×{grid.height} grid, {grid.num_rooms} rooms: {room_summary}", "duration_ms": grid_ms},
-                {"step": "furniture_specs", "message": "Generating furniture list (Claude)",
-                 "input_prompt": spec_prompt,
-                 "model": "anthropic/claude-sonnet-4-6"},
-            )})
+            grid_msg = f"{grid.width}×{grid.height} grid, {grid.num_rooms} rooms: {room_summary}"
+            ctx.emit("grid_ready", message=grid_msg, duration_ms=grid_ms)
+            ctx.emit("furniture_specs", message="Generating furniture list (Claude)",
+                     input_prompt=spec_prompt,
+                     model="anthropic/claude-sonnet-4-6")
+            ctx.flush()
 
             # --- Step 4: Furniture specs (Claude) ---
-            db.update_session(session_id, {"status": "searching"})
+            ctx.set_status("searching")
 
             # Wrap llm_call to capture raw response text
             llm_traces: dict[str, str] = {}
@@ -345,12 +772,12 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
 
             async def tracing_llm_call(system: str, user: str, temperature: float) -> str:
                 result = await raw_llm_call(system, user, temperature)
-                llm_traces[system[:40]] = result
+                llm_traces[system[:40]] = result[:_TRACE_TEXT_MAX]
                 return result
 
-            t0 = time.time()
+            t0 = time.perf_counter_ns()
             specs = await _generate_specs_impl(grid, preferences, tracing_llm_call)
-            specs_ms = round((time.time() - t0) * 1000)
+            specs_ms = _ms_since(t0)
             total_items = sum(len(v) for v in specs.values())
 
             # Get the raw LLM output for the spec agent
@@ -360,24 +787,44 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
                 indent=2,
             )
 
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "nano_banana", "duration_ms": nano_ms, "image_url": colored_url,
-                 "input_image": binary_url, "model": "google/gemini-3-pro-image-preview"},
-                {"step": "grid_ready", "duration_ms": grid_ms},
-                {"step": "furniture_specs", "message": f"{total_items} furniture items specified",
-                 "duration_ms": specs_ms, "model": "anthropic/claude-sonnet-4-6",
-                 "input_prompt": spec_prompt,
-                 "output_text": spec_output[:3000]},
-                {"step": "searching_ikea", "message": "Searching IKEA catalog"},
-            )})
-
-            # --- Step 5: IKEA search ---
+            ctx.emit("furniture_specs", message=f"{total_items} furniture items specified",
+                     duration_ms=specs_ms, output_text=spec_output)
+            ctx.emit("searching_ikea", message="Searching IKEA catalog", input_prompt=specs_summary)
+
+            # --- Step 5: IKEA search, with constraints (Claude) generated concurrently ---
+            # Constraints reference items by name, so they are generated from the
+            # estimated specs while IKEA looks up real products, and only regenerated
+            # if the real dimensions turn out very different from the estimates.
             from ..tools.ikea.search import ikea_results_to_spec_updates, search_ikea_products
 
-            t0 = time.time()
-            ikea_results = await search_ikea_products(specs)
-            ikea_ms = round((time.time() - t0) * 1000)
+            estimated_specs = copy.deepcopy(specs)
+            furn_info = _furniture_info_for_prompt(estimated_specs)
+            constraint_prompt = _CONSTRAINT_PROMPT.format(
+                room_info=room_info, furniture_info=furn_info,
+            )
+            llm_traces.clear()
+            t_constraints = time.perf_counter_ns()
+            constraints_task = asyncio.create_task(
+                _generate_constraints_impl(grid, estimated_specs, preferences, tracing_llm_call)
+            )
+            ctx.emit("constraints", message="Generating placement constraints (Claude)",
+                     input_prompt=constraint_prompt,
+                     model="anthropic/claude-sonnet-4-6")
+            ctx.flush()
+
+            t0 = time.perf_counter_ns()
+            try:
+                ikea_results = await asyncio.wait_for(
+                    search_ikea_products(specs), _IKEA_SEARCH_TIMEOUT_S,
+                )
+            except TimeoutError:
+                logger.warning("IKEA search timed out after %ds, continuing without products",
+                               _IKEA_SEARCH_TIMEOUT_S)
+                ikea_results = []
+            except BaseException:
+                constraints_task.cancel()
+                raise
+            ikea_ms = _ms_since(t0)
             found = sum(1 for r in ikea_results if r.get("found"))
             with_glb = sum(1 for r in ikea_results if r.get("glb_url"))
 
@@ -385,38 +832,34 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
             if spec_updates:
                 update_specs_from_search_results(specs, spec_updates)
 
-            ikea_lookup: dict[tuple[str, str], dict] = {}
-            for r in ikea_results:
-                if r.get("found"):
-                    ikea_lookup[(r["room_name"], r["name"])] = r
+            ikea_lookup: dict[tuple[str, str], dict] = {
+                (r["room_name"], r["name"]): r for r in ikea_results if r.get("found")
+            }
 
             search_queries = specs_to_search_queries(specs, preferences)
 
             # Save furniture items to DB so the sidebar shows them during processing
-            for r in ikea_results:
-                if not r.get("found"):
-                    continue
-                try:
-                    db.upsert_furniture({
-                        "id": r.get("ikea_item_code") or f"{r['room_name']}_{r['name']}",
-                        "session_id": session_id,
-                        "retailer": "ikea",
-                        "name": r.get("ikea_name") or r["name"],
-                        "price": r.get("price") or 0,
-                        "currency": r.get("currency") or "EUR",
-                        "image_url": r.get("image_url", ""),
-                        "product_url": r.get("buy_url", ""),
-                        "glb_url": r.get("glb_url", ""),
-                        "category": r.get("room_name", ""),
-                        "dimensions": {
-                            "width_cm": (r.get("width_cm") or 0),
-                            "depth_cm": (r.get("depth_cm") or 0),
-                            "height_cm": (r.get("height_cm") or 0),
-                        },
-                        "selected": True,
-                    })
-                except Exception:
-                    logger.debug("Failed to upsert IKEA item %s", r.get("name"))
+            await _upsert_furniture_all([
+                {
+                    "id": r.get("ikea_item_code") or f"{r['room_name']}_{r['name']}",
+                    "session_id": session_id,
+                    "retailer": "ikea",
+                    "name": r.get("ikea_name") or r["name"],
+                    "price": r.get("price") or 0,
+                    "currency": r.get("currency") or "EUR",
+                    "image_url": r.get("image_url", ""),
+                    "product_url": r.get("buy_url", ""),
+                    "glb_url": r.get("glb_url", ""),
+                    "category": r.get("room_name", ""),
+                    "dimensions": {
+                        "width_cm": (r.get("width_cm") or 0),
+                        "depth_cm": (r.get("depth_cm") or 0),
+                        "height_cm": (r.get("height_cm") or 0),
+                    },
+                    "selected": True,
+                }
+                for r in ikea_lookup.values()
+            ])
 
             # IKEA summary for trace output
             ikea_summary = "\n".join(
@@ -426,85 +869,85 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
                 for r in ikea_results
             )
 
-            # Build constraint prompt for trace
-            furn_info = _furniture_info_for_prompt(specs)
-            constraint_prompt = _CONSTRAINT_PROMPT.format(
-                room_info=room_info, furniture_info=furn_info,
-            )
-
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "nano_banana", "duration_ms": nano_ms, "image_url": colored_url,
-                 "input_image": binary_url, "model": "google/gemini-3-pro-image-preview"},
-                {"step": "grid_ready", "duration_ms": grid_ms},
-                {"step": "furniture_specs", "duration_ms": specs_ms, "model": "anthropic/claude-sonnet-4-6",
-                 "input_prompt": spec_prompt, "output_text": spec_output[:3000]},
-                {"step": "searching_ikea", "message": f"{found}/{len(ikea_results)} found, {with_glb} with 3D models",
-                 "duration_ms": ikea_ms,
-                 "input_prompt": specs_summary,
-                 "output_text": ikea_summary},
-                {"step": "constraints", "message": "Generating placement constraints (Claude)",
-                 "input_prompt": constraint_prompt,
-                 "model": "anthropic/claude-sonnet-4-6"},
-            )})
+            ctx.emit("searching_ikea",
+                     message=f"{found}/{len(ikea_results)} found, {with_glb} with 3D models",
+                     duration_ms=ikea_ms, output_text=ikea_summary)
 
             # --- Step 6: Constraints (Claude) ---
-            db.update_session(session_id, {"status": "placing"})
-
-            llm_traces.clear()
-            t0 = time.time()
-            constraints = await _generate_constraints_impl(grid, specs, preferences, tracing_llm_call)
-            constraints_ms = round((time.time() - t0) * 1000)
+            ctx.set_status("placing")
+
+            constraints = await constraints_task
+            if _footprints_changed(estimated_specs, specs, _CONSTRAINT_RERUN_DELTA):
+                logger.info("IKEA dimensions differ from estimates, regenerating constraints")
+                furn_info = _furniture_info_for_prompt(specs)
+                constraint_prompt = _CONSTRAINT_PROMPT.format(
+                    room_info=room_info, furniture_info=furn_info,
+                )
+                llm_traces.clear()
+                constraints = await _generate_constraints_impl(
+                    grid, specs, preferences, tracing_llm_call,
+                )
+            constraints_ms = _ms_since(t_constraints)
 
             constraint_output = llm_traces.get(_CONSTRAINT_SYSTEM[:40], "")
 
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "nano_banana", "duration_ms": nano_ms, "image_url": colored_url,
-                 "input_image": binary_url, "model": "google/gemini-3-pro-image-preview"},
-                {"step": "grid_ready", "duration_ms": grid_ms},
-                {"step": "furniture_specs", "duration_ms": specs_ms, "model": "anthropic/claude-sonnet-4-6",
-                 "input_prompt": spec_prompt, "output_text": spec_output[:3000]},
-                {"step": "searching_ikea", "duration_ms": ikea_ms,
-                 "output_text": ikea_summary},
-                {"step": "constraints", "message": "Constraints ready", "duration_ms": constraints_ms,
-                 "model": "anthropic/claude-sonnet-4-6",
-                 "input_prompt": constraint_prompt,
-                 "output_text": constraint_output[:3000]},
-                {"step": "optimizing", "message": "Running Gurobi optimizer"},
-            )})
+            ctx.emit("constraints", message="Constraints ready", duration_ms=constraints_ms,
+                     input_prompt=constraint_prompt,
+                     output_text=constraint_output)
+            ctx.emit("optimizing", message="Running Gurobi optimizer")
+            ctx.flush()
 
             # --- Step 7: Gurobi optimizer ---
             from ..furniture_placement.coord_convert import convert_all_placements
-            from ..furniture_placement.optimizer import FurniturePlacementModel
+            from ..furniture_placement.opt_cache import model_cache_key
+            from ..furniture_placement.optimizer import greedy_placement
 
             opt_furniture = specs_to_optimizer_format(specs, 0.25)
             opt_constraints = constraints_to_optimizer_format(constraints, 0.25)
-
-            t0 = time.time()
-            model = FurniturePlacementModel(
-                grid=grid,
-                furniture=opt_furniture,
-                constraints=opt_constraints,
-                time_limit=180,
+            warm_start = _previous_grid_placements(session, grid)
+
+            t0 = time.perf_counter_ns()
+            deadline = time.monotonic() + _GUROBI_DEADLINE_S
+            # Dropping distance targets, the first relaxation, edits the failed model in place
+            placements, distance_dropped = await _solve_placement(
+                grid, opt_furniture, opt_constraints, warm_start,
+                drop_distance_on_failure=True, deadline=deadline, **_GUROBI_OPTIONS,
             )
-            placements = await asyncio.to_thread(model.optimize)
 
-            if not placements:
-                logger.info("No solution, retrying without distance constraints...")
-                for room_name in opt_constraints:
-                    opt_constraints[room_name].distance_constraints = []
-                model = FurniturePlacementModel(
-                    grid=grid,
-                    furniture=opt_furniture,
-                    constraints=opt_constraints,
-                    time_limit=180,
+            # Relax progressively; copies keep earlier (cached) models' inputs intact
+            relaxed: list[str] = ["distance"] if distance_dropped else []
+            for label, relax in _RELAX_STEPS:
+                if placements:
+                    break
+                if deadline - time.monotonic() < _GUROBI_MIN_SOLVE_S:
+                    logger.warning("Placement deadline reached, skipping remaining relaxations")
+                    break
+                before = model_cache_key(grid, opt_furniture, opt_constraints)
+                opt_furniture = dict(opt_furniture)
+                opt_constraints = {r: copy.copy(c) for r, c in opt_constraints.items()}
+                relax(opt_furniture, opt_constraints, specs)
+                # A step that changed nothing would just fail the same solve again
+                after = model_cache_key(grid, opt_furniture, opt_constraints)
+                if label in relaxed or after == before:
+                    continue
+                logger.warning("No solution, applying relaxation: %s", label)
+                relaxed.append(label)
+                # Rebuilt models start from the previous run or, failing that, a
+                # non-overlapping greedy layout of the relaxed furniture
+                retry_start = warm_start or greedy_placement(grid, opt_furniture)
+                placements, _ = await _solve_placement(
+                    grid, opt_furniture, opt_constraints, retry_start, deadline=deadline,
+                    **{**_GUROBI_OPTIONS, "mip_gap": _GUROBI_RETRY_MIP_GAP},
                 )
-                placements = await asyncio.to_thread(model.optimize)
-            gurobi_ms = round((time.time() - t0) * 1000)
 
             if not placements:
-                raise ValueError("Gurobi found no feasible solution")
+                logger.warning("No Gurobi solution, falling back to greedy placement")
+                placements = greedy_placement(grid, opt_furniture)
+                relaxed.append("greedy")
+            gurobi_ms = _ms_since(t0)
+
+            if not placements:
+                raise ValueError("No furniture could be placed")
 
             # Placement summary for trace
             placement_summary = "\n".join(
@@ -513,97 +956,53 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
                 for p in placements
             )
 
-            db.update_job(job_id, {"trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "nano_banana", "duration_ms": nano_ms, "image_url": colored_url,
-                 "input_image": binary_url, "model": "google/gemini-3-pro-image-preview"},
-                {"step": "grid_ready", "duration_ms": grid_ms},
-                {"step": "furniture_specs", "duration_ms": specs_ms, "model": "anthropic/claude-sonnet-4-6",
-                 "input_prompt": spec_prompt, "output_text": spec_output[:3000]},
-                {"step": "searching_ikea", "duration_ms": ikea_ms,
-                 "output_text": ikea_summary},
-                {"step": "constraints", "duration_ms": constraints_ms, "model": "anthropic/claude-sonnet-4-6",
-                 "input_prompt": constraint_prompt, "output_text": constraint_output[:3000]},
-                {"step": "optimizing", "message": f"{len(placements)} items placed",
-                 "duration_ms": gurobi_ms, "model": "Gurobi IP",
-                 "output_text": placement_summary},
-                {"step": "trellis_3d", "message": "Generating 3D models (Trellis)"},
-            )})
+            optimizing_msg = f"{len(placements)} items placed"
+            if relaxed:
+                optimizing_msg += f" (relaxed: {', '.join(relaxed)})"
+            ctx.emit("optimizing", message=optimizing_msg,
+                     duration_ms=gurobi_ms, model="Gurobi IP",
+                     output_text=placement_summary)
+            ctx.emit("trellis_3d", message="Generating 3D models (Trellis)")
+            ctx.flush()
 
             # --- Step 8: Convert to 3D + Trellis models ---
-            coords_3d = convert_all_placements(placements, grid)
-
-            api_placements = []
-            for coord in coords_3d:
-                ikea_data = ikea_lookup.get((coord["room_name"], coord["name"]), {})
-                api_placements.append({
-                    "item_id": ikea_data.get("ikea_item_code") or coord["name"],
-                    "name": coord["name"],
-                    "position": coord["position"],
-                    "rotation_y_degrees": coord["rotation_y_degrees"],
-                    "room_name": coord["room_name"],
-                    "size_m": coord.get("size_m", {}),
-                    "glb_url": ikea_data.get("glb_url", ""),
-                    "image_url": ikea_data.get("image_url", ""),
-                    "buy_url": ikea_data.get("buy_url", ""),
-                    "ikea_item_code": ikea_data.get("ikea_item_code", ""),
-                    "ikea_name": ikea_data.get("ikea_name", ""),
-                    "price": ikea_data.get("price"),
-                    "currency": ikea_data.get("currency", ""),
-                    "reasoning": f"Gurobi-optimized placement in {coord['room_name']}",
-                })
+            api_placements = [
+                _to_api(c, ikea_lookup.get((c["room_name"], c["name"]), {}))
+                for c in convert_all_placements(placements, grid)
+            ]
 
             # Generate Trellis 3D models for items missing GLBs
             from ..tools.ikea.trellis_fallback import generate_missing_models
 
-            t0 = time.time()
-            total_with_glb = await generate_missing_models(
-                api_placements, max_calls=10, dry_run=False,
+            ready = [p for p in api_placements if p.get("glb_url")]
+            missing = [p for p in api_placements if not p.get("glb_url")]
+            t0 = time.perf_counter_ns()
+            trellis_task = asyncio.create_task(
+                generate_missing_models(missing, max_calls=10, dry_run=False)
             )
-            trellis_ms = round((time.time() - t0) * 1000)
 
         # --- Step 9: Save to session DB ---
         placement_result = {"placements": api_placements}
 
-        # Update furniture items with final placement data
-        for p in api_placements:
-            try:
-                db.upsert_furniture({
-                    "id": p.get("item_id") or p["name"],
-                    "session_id": session_id,
-                    "retailer": "ikea" if p.get("buy_url") else "generated",
-                    "name": p.get("ikea_name") or p["name"],
-                    "price": p.get("price") or 0,
-                    "currency": p.get("currency") or "EUR",
-                    "image_url": p.get("image_url", ""),
-                    "product_url": p.get("buy_url", ""),
-                    "glb_url": p.get("glb_url", ""),
-                    "category": p.get("room_name", ""),
-                    "dimensions": {
-                        "width_cm": (p.get("size_m", {}).get("width", 0)) * 100,
-                        "depth_cm": (p.get("size_m", {}).get("depth", p.get("size_m", {}).get("length", 0))) * 100,
-                        "height_cm": (p.get("size_m", {}).get("height", 0)) * 100,
-                    },
-                    "selected": True,
-                })
-            except Exception:
-                logger.debug("Failed to upsert furniture item %s", p.get("item_id", p["name"]))
+        # Items that already have a GLB are saved while Trellis generates the rest;
+        # the others are saved once their glb_url is filled in
+        try:
+            await _upsert_furniture_all([_build_payload(session_id, p) for p in ready])
+            generated = await trellis_task
+        except BaseException:
+            trellis_task.cancel()
+            raise
+        trellis_ms = _ms_since(t0)
+        total_with_glb = len(ready) + generated
+        await _upsert_furniture_all([_build_payload(session_id, p) for p in missing])
 
         grid_data = grid.to_dict()
         furniture_specs = {
-            room: [
-                {
-                    "name": i.name, "category": i.category,
-                    "length_m": i.length_m, "width_m": i.width_m,
-                    "height_m": i.height_m, "search_query": i.search_query,
-                    "priority": i.priority,
-                }
-                for i in items
-            ]
+            room: [dict(zip(_SPEC_KEYS, _SPEC_GET(i))) for i in items]
             for room, items in specs.items()
         }
 
-        db.update_session(session_id, {
+        ctx.update_session({
             "placements": placement_result,
             "grid_data": grid_data,
             "furniture_specs": furniture_specs,
@@ -611,32 +1010,10 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
             "status": "placement_ready",
         })
 
-        db.update_job(job_id, {
-            "status": "completed",
-            "trace": _trace(
-                {"step": "started", "duration_ms": 1},
-                {"step": "nano_banana", "message": "Rooms colored", "duration_ms": nano_ms,
-                 "image_url": colored_url, "input_image": floorplan_url,
-                 "input_prompt": _NANO_BANANA_PROMPT,
-                 "model": "google/gemini-3-pro-image-preview"},
-                {"step": "grid_ready", "message": f"{grid.width}×{grid.height}, {grid.num_rooms} rooms",
-                 "duration_ms": grid_ms},
-                {"step": "furniture_specs", "message": f"{total_items} items",
-                 "duration_ms": specs_ms, "model": "anthropic/claude-sonnet-4-6",
-                 "input_prompt": spec_prompt, "output_text": spec_output[:3000]},
-                {"step": "searching_ikea", "message": f"{found} found, {with_glb} GLBs",
-                 "duration_ms": ikea_ms, "output_text": ikea_summary},
-                {"step": "constraints", "message": "Constraints ready",
-                 "duration_ms": constraints_ms, "model": "anthropic/claude-sonnet-4-6",
-                 "input_prompt": constraint_prompt, "output_text": constraint_output[:3000]},
-                {"step": "optimizing", "message": f"{len(api_placements)} items placed",
-                 "duration_ms": gurobi_ms, "model": "Gurobi IP",
-                 "output_text": placement_summary},
-                {"step": "trellis_3d", "message": f"{total_with_glb}/{len(api_placements)} with 3D",
-                 "duration_ms": trellis_ms, "model": "fal-ai/trellis-2"},
-                {"step": "completed"},
-            ),
-        })
+        ctx.emit("trellis_3d", message=f"{total_with_glb}/{len(api_placements)} with 3D",
+                 duration_ms=trellis_ms, model="fal-ai/trellis-2")
+        ctx.emit("completed")
+        ctx.flush(status="completed")
 
         logger.info(
             "Gurobi pipeline complete: session=%s, %d items placed",
@@ -652,11 +1029,11 @@ async def place_furniture_gurobi(session_id: str, job_id: str) -> dict:
     except Exception as e:
         logger.error("Gurobi placement failed: %s", e, exc_info=True)
         try:
-            db.update_job(job_id, {
-                "status": "failed",
-                "trace": [{"step": "error", "message": str(e)}],
-            })
-            db.update_session(session_id, {"status": "placing_failed"})
+            ctx.emit("error", message=str(e))
+            ctx.set_status("placing_failed")
+            ctx.flush(status="failed")
         except Exception:
             pass
         raise
+    finally:
+        await http.aclose()
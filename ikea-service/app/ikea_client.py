@@ -1,23 +1,47 @@
 from __future__ import annotations
 
+import time
+from collections import OrderedDict
 from typing import Any
 
-import httpx
 import ikea_api
+import orjson
 
+from app.http_client import get_http_client
 from app.models import FurnitureItem, ModelFile, ProductImage, StockInfo, Variant
 
 CONSTANTS = ikea_api.Constants(country="gb", language="en")
+# Endpoint wrappers only hold constants and session info, so one of each is reused
+_SEARCH = ikea_api.Search(CONSTANTS)
+_STOCK = ikea_api.Stock(CONSTANTS)
+
+# Raw search responses are cached per (query, limit) in an LRU; parsing them again
+# is cheap and gives each caller its own FurnitureItem objects to mutate.
+SEARCH_CACHE_TTL_S = 3600
+SEARCH_CACHE_MAX = 1024
+_search_cache: OrderedDict[tuple[str, int], tuple[float, dict[str, Any]]] = OrderedDict()
+
+# Rotera model lists per item code (LRU, same TTL as searches)
+MODELS_CACHE_MAX = 1024
+_models_cache: OrderedDict[str, tuple[float, list[ModelFile]]] = OrderedDict()
+
+
+def _as_float(value: Any) -> float | None:
+    return float(value) if value is not None else None
 
 
 def _parse_product(product: dict[str, Any]) -> FurnitureItem:
-    """Parse a product dict from the IKEA search API into a FurnitureItem."""
+    """Parse a product dict from the IKEA search API into a FurnitureItem.
+
+    The search response is already well-typed, so models are built with
+    model_construct (no validation); numeric fields are coerced explicitly.
+    """
     price_obj = product.get("salesPrice", {})
     price_val = price_obj.get("numeral") if price_obj else None
     currency = price_obj.get("currencyCode") if price_obj else None
 
     images = [
-        ProductImage(
+        ProductImage.model_construct(
             url=img.get("url", ""),
             alt=img.get("altText"),
             type=img.get("type"),
@@ -36,33 +60,33 @@ def _parse_product(product: dict[str, Any]) -> FurnitureItem:
     for v in gpr.get("variants", []):
         v_price = v.get("salesPrice", {})
         variants.append(
-            Variant(
+            Variant.model_construct(
                 item_code=v.get("id", ""),
                 name=v.get("name"),
                 description=f"{v.get('name', '')} {v.get('typeName', '')}".strip() or None,
                 color=v.get("validDesignText"),
                 dimensions=v.get("itemMeasureReferenceText"),
-                price=v_price.get("numeral") if v_price else None,
+                price=_as_float(v_price.get("numeral")) if v_price else None,
                 currency=v_price.get("currencyCode") if v_price else None,
                 image_url=v.get("mainImageUrl"),
                 buy_url=v.get("pipUrl"),
             )
         )
 
-    return FurnitureItem(
+    return FurnitureItem.model_construct(
         item_code=product.get("id", product.get("itemNo", "")),
         name=product.get("name"),
         type_name=product.get("typeName"),
         description=f"{product.get('name', '')} {product.get('typeName', '')}, {product.get('itemMeasureReferenceText', '')}".strip(", "),
         dimensions=product.get("itemMeasureReferenceText"),
-        price=price_val,
+        price=_as_float(price_val),
         currency=currency,
         image_url=product.get("mainImageUrl"),
         images=images,
         buy_url=product.get("pipUrl"),
         category=category,
         color=color,
-        rating=product.get("ratingValue"),
+        rating=_as_float(product.get("ratingValue")),
         rating_count=product.get("ratingCount"),
         variants=variants,
     )
@@ -80,28 +104,43 @@ def _extract_products(raw: dict[str, Any]) -> list[dict[str, Any]]:
     ]
 
 
-async def search_products(query: str, limit: int = 24) -> list[FurnitureItem]:
-    search = ikea_api.Search(CONSTANTS)
-    endpoint = search.search(query, limit=limit)
+async def _search_raw(query: str, limit: int) -> dict[str, Any]:
+    """Run an IKEA search, reusing a recent response for the same query and limit."""
+    key = (query.strip().lower(), limit)
+    entry = _search_cache.get(key)
+    if entry is not None:
+        if entry[0] > time.monotonic():
+            _search_cache.move_to_end(key)
+            return entry[1]
+        del _search_cache[key]
+
+    endpoint = _SEARCH.search(query, limit=limit)
     raw = await ikea_api.run_async(endpoint)
+    _search_cache[key] = (time.monotonic() + SEARCH_CACHE_TTL_S, raw)
+    _search_cache.move_to_end(key)
+    while len(_search_cache) > SEARCH_CACHE_MAX:
+        _search_cache.popitem(last=False)
+    return raw
+
+
+async def search_products(query: str, limit: int = 24) -> list[FurnitureItem]:
+    raw = await _search_raw(query, limit)
     return [_parse_product(p) for p in _extract_products(raw)]
 
 
 async def get_product_details(item_code: str) -> FurnitureItem | None:
     """Look up a single product by item code using the search API."""
-    search = ikea_api.Search(CONSTANTS)
-    endpoint = search.search(item_code, limit=5)
-    raw = await ikea_api.run_async(endpoint)
+    raw = await _search_raw(item_code, limit=5)
 
-    for product in _extract_products(raw):
-        if product.get("id") == item_code or product.get("itemNo") == item_code:
-            return _parse_product(product)
-
-    # If exact match not found, return first result
     products = _extract_products(raw)
-    if products:
-        return _parse_product(products[0])
-    return None
+    if not products:
+        return None
+    # Prefer an exact item-code match, otherwise the first result
+    match = next(
+        (p for p in products if p.get("id") == item_code or p.get("itemNo") == item_code),
+        products[0],
+    )
+    return _parse_product(match)
 
 
 async def get_3d_models(item_code: str) -> list[ModelFile]:
@@ -109,24 +148,33 @@ async def get_3d_models(item_code: str) -> list[ModelFile]:
 
     Calls the IKEA Rotera API directly with httpx because the ikea_api
     library's executor doesn't handle gzip-encoded responses properly.
+    Results are cached per item code for SEARCH_CACHE_TTL_S.
     """
+    entry = _models_cache.get(item_code)
+    if entry is not None and entry[0] > time.monotonic():
+        _models_cache.move_to_end(item_code)
+        return list(entry[1])
+
     url = f"{CONSTANTS.base_url}/global/assets/rotera/resources/{item_code}.json"
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, headers={"Accept-Encoding": "gzip"})
-        resp.raise_for_status()
-        raw = resp.json()
+    resp = await get_http_client().get(url, headers={"Accept-Encoding": "gzip"})
+    resp.raise_for_status()
+    raw = orjson.loads(resp.content)
 
     models: list[ModelFile] = []
     for model in raw.get("models", []):
         model_url = model.get("url", "")
         fmt = model.get("format", "")
         if model_url and fmt:
-            models.append(ModelFile(format=fmt, url=model_url, source_url=model_url))
-    return models
+            models.append(ModelFile.model_construct(format=fmt, url=model_url, source_url=model_url))
+
+    _models_cache[item_code] = (time.monotonic() + SEARCH_CACHE_TTL_S, models)
+    _models_cache.move_to_end(item_code)
+    while len(_models_cache) > MODELS_CACHE_MAX:
+        _models_cache.popitem(last=False)
+    return list(models)
 
 
 async def get_stock(item_code: str) -> StockInfo:
-    stock = ikea_api.Stock(CONSTANTS)
-    endpoint = stock.get_stock(item_code)
+    endpoint = _STOCK.get_stock(item_code)
     raw = await ikea_api.run_async(endpoint)
     return StockInfo(item_code=item_code, available=raw)
@@ -1,5 +1,9 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.gzip import GZipMiddleware
 
+from app.http_client import close_http_client
 from app.ikea_client import get_3d_models, get_product_details, get_stock, search_products
 from app.models import (
     FurnitureItem,
@@ -11,7 +15,15 @@ from app.models import (
 )
 from app.pipeline import run_pipeline
 
-app = FastAPI(title="IKEA Furniture API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_http_client()
+
+
+app = FastAPI(title="IKEA Furniture API", version="1.0.0", lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 
 @app.get("/health")
@@ -1,14 +1,18 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 
 from app.ikea_client import get_3d_models, search_products
 from app.models import FurnitureQuery, FurnitureItem, ModelFile, PipelineResult
 from app.storage import download_and_upload_model, model_exists
-from app.vector_db import search_similar, upsert_item
+from app.vector_db import search_similar, upsert_item, upsert_items
 
 logger = logging.getLogger(__name__)
 
+# Max queries processed at once, to stay polite to the IKEA API
+PIPELINE_CONCURRENCY = 8
+
 
 async def _fetch_and_upload_models(item: FurnitureItem) -> list[ModelFile]:
     """Fetch 3D models for an item, upload GLB to DO Spaces."""
@@ -18,42 +22,42 @@ async def _fetch_and_upload_models(item: FurnitureItem) -> list[ModelFile]:
         logger.warning("Could not fetch 3D models for %s: %s", item.item_code, e)
         return []
 
-    uploaded: list[ModelFile] = []
-    for model in models:
-        if "glb" not in model.format:
-            continue
-
+    async def _handle_one(model: ModelFile) -> ModelFile:
         # Check if already uploaded
-        existing_url = model_exists(item.item_code, model.format)
+        existing_url = await model_exists(item.item_code, model.format)
         if existing_url:
-            uploaded.append(
-                ModelFile(format=model.format, url=existing_url, source_url=model.source_url)
-            )
-            continue
+            return model.model_copy(update={"url": existing_url})
 
         try:
             spaces_url = await download_and_upload_model(
                 item.item_code, model.source_url, model.format
             )
-            if spaces_url:
-                uploaded.append(
-                    ModelFile(format=model.format, url=spaces_url, source_url=model.source_url)
-                )
-            else:
-                # DO Spaces not configured, use IKEA CDN URL directly
-                uploaded.append(model)
         except Exception as e:
             logger.warning("Failed to upload model for %s: %s", item.item_code, e)
             # Fall back to IKEA CDN URL
-            uploaded.append(model)
-
-    return uploaded
-
-
-async def process_query(query: FurnitureQuery) -> PipelineResult:
-    """Process a single furniture query through the pipeline."""
-    # 1. Check vector DB cache
-    cached = search_similar(query.description, query.category, query.dimensions)
+            return model
+        if spaces_url:
+            return model.model_copy(update={"url": spaces_url})
+        # DO Spaces not configured, use IKEA CDN URL directly
+        return model
+
+    glbs = [model for model in models if "glb" in model.format]
+    return list(await asyncio.gather(*(_handle_one(m) for m in glbs)))
+
+
+async def process_query(
+    query: FurnitureQuery,
+    pending_upserts: list[tuple[FurnitureItem, str | None]] | None = None,
+) -> PipelineResult:
+    """Process a single furniture query through the pipeline.
+
+    If pending_upserts is given, the Qdrant write is queued there for the caller
+    to flush in one batch instead of being made immediately.
+    """
+    # 1. Check vector DB cache (embedding + Qdrant are blocking, so run in a thread)
+    cached = await asyncio.to_thread(
+        search_similar, query.description, query.category, query.dimensions
+    )
     if cached is not None:
         return PipelineResult(query=query, source="cache", item=cached)
 
@@ -78,18 +82,40 @@ async def process_query(query: FurnitureQuery) -> PipelineResult:
     item.model_files = await _fetch_and_upload_models(item)
 
     # 4. Cache in vector DB
-    try:
-        upsert_item(item, description=query.description)
-    except Exception as e:
-        logger.warning("Failed to cache item %s in Qdrant: %s", item.item_code, e)
+    if pending_upserts is not None:
+        pending_upserts.append((item, query.description))
+    else:
+        try:
+            upsert_item(item, description=query.description)
+        except Exception as e:
+            logger.warning("Failed to cache item %s in Qdrant: %s", item.item_code, e)
 
     return PipelineResult(query=query, source="ikea_api", item=item)
 
 
 async def run_pipeline(queries: list[FurnitureQuery]) -> list[PipelineResult]:
-    """Process a list of furniture queries through the full pipeline."""
+    """Process a list of furniture queries through the full pipeline.
+
+    Queries run concurrently (at most PIPELINE_CONCURRENCY at a time); results
+    keep the order of the queries, and a query that fails yields an empty result.
+    """
+    sem = asyncio.Semaphore(PIPELINE_CONCURRENCY)
+    pending: list[tuple[FurnitureItem, str | None]] = []
+
+    async def _run(query: FurnitureQuery) -> PipelineResult:
+        async with sem:
+            return await process_query(query, pending)
+
+    outcomes = await asyncio.gather(*(_run(q) for q in queries), return_exceptions=True)
     results: list[PipelineResult] = []
-    for query in queries:
-        result = await process_query(query)
-        results.append(result)
+    for query, outcome in zip(queries, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error("Pipeline failed for '%s': %s", query.description, outcome)
+            outcome = PipelineResult(query=query, source="ikea_api", item=None)
+        results.append(outcome)
+
+    try:
+        await asyncio.to_thread(upsert_items, pending)
+    except Exception as e:
+        logger.warning("Failed to cache %d items in Qdrant: %s", len(pending), e)
     return results
@@ -1,12 +1,23 @@
 from __future__ import annotations
 
+import asyncio
 import os
-from io import BytesIO
+import tempfile
+import time
 
-import httpx
+from app.http_client import get_http_client
 
 _client = None
 
+# Uploaded models never change for an item code, so existence checks are memoized
+MODEL_EXISTS_TTL_S = 3600
+_exists_cache: dict[tuple[str, str], tuple[str, float]] = {}
+
+CONTENT_TYPES = {"glb": "model/gltf-binary", "usdz": "model/vnd.usdz+zip"}
+
+# Downloads larger than this spill from memory to a temp file before upload
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
 
 def _is_configured() -> bool:
     return bool(os.environ.get("DO_SPACES_KEY") and os.environ.get("DO_SPACES_SECRET"))
@@ -47,37 +58,50 @@ async def download_and_upload_model(
     if not _is_configured():
         return None
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(source_url, follow_redirects=True)
-        resp.raise_for_status()
-        data = resp.content
-
     key = f"models/{item_code}.{fmt}"
-    content_types = {"glb": "model/gltf-binary", "usdz": "model/vnd.usdz+zip"}
 
-    s3 = _get_s3_client()
-    s3.upload_fileobj(
-        BytesIO(data),
-        _get_bucket(),
-        key,
-        ExtraArgs={
-            "ContentType": content_types.get(fmt, "application/octet-stream"),
-            "ACL": "public-read",
-        },
-    )
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as body:
+        async with get_http_client().stream("GET", source_url, follow_redirects=True) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.aiter_bytes():
+                body.write(chunk)
+        body.seek(0)
+
+        s3 = _get_s3_client()
+        await asyncio.to_thread(
+            s3.upload_fileobj,
+            body,
+            _get_bucket(),
+            key,
+            ExtraArgs={
+                "ContentType": CONTENT_TYPES.get(fmt, "application/octet-stream"),
+                "ACL": "public-read",
+            },
+        )
+
+    url = _public_url(key)
+    _exists_cache[(item_code, fmt)] = (url, time.monotonic() + MODEL_EXISTS_TTL_S)
+    return url
 
-    return _public_url(key)
 
+async def model_exists(item_code: str, fmt: str = "glb") -> str | None:
+    """Check if a model already exists in storage. Returns URL if it does.
 
-def model_exists(item_code: str, fmt: str = "glb") -> str | None:
-    """Check if a model already exists in storage. Returns URL if it does."""
+    Hits are cached for MODEL_EXISTS_TTL_S; misses always go to S3.
+    """
     if not _is_configured():
         return None
 
+    cached = _exists_cache.get((item_code, fmt))
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+
     key = f"models/{item_code}.{fmt}"
     s3 = _get_s3_client()
     try:
-        s3.head_object(Bucket=_get_bucket(), Key=key)
-        return _public_url(key)
+        await asyncio.to_thread(s3.head_object, Bucket=_get_bucket(), Key=key)
     except s3.exceptions.ClientError:
         return None
+    url = _public_url(key)
+    _exists_cache[(item_code, fmt)] = (url, time.monotonic() + MODEL_EXISTS_TTL_S)
+    return url
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import threading
 
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, PointStruct, VectorParams
@@ -14,25 +15,30 @@ SIMILARITY_THRESHOLD = 0.85
 
 _qdrant: QdrantClient | None = None
 _embedder: SentenceTransformer | None = None
+# Lookups run in worker threads, so lazy initialization is serialized
+_init_lock = threading.Lock()
 
 
 def _get_qdrant() -> QdrantClient:
     global _qdrant
-    if _qdrant is None:
-        url = os.environ.get("QDRANT_URL", "")
-        if url:
-            _qdrant = QdrantClient(url=url)
-        else:
-            # In-memory mode for local dev without a Qdrant server
-            _qdrant = QdrantClient(":memory:")
-        _ensure_collection(_qdrant)
+    with _init_lock:
+        if _qdrant is None:
+            url = os.environ.get("QDRANT_URL", "")
+            if url:
+                client = QdrantClient(url=url)
+            else:
+                # In-memory mode for local dev without a Qdrant server
+                client = QdrantClient(":memory:")
+            _ensure_collection(client)
+            _qdrant = client
     return _qdrant
 
 
 def _get_embedder() -> SentenceTransformer:
     global _embedder
-    if _embedder is None:
-        _embedder = SentenceTransformer("all-MiniLM-L6-v2")
+    with _init_lock:
+        if _embedder is None:
+            _embedder = SentenceTransformer("all-MiniLM-L6-v2")
     return _embedder
 
 
@@ -87,17 +93,30 @@ def search_similar(
 
 def upsert_item(item: FurnitureItem, description: str | None = None):
     """Store a furniture item in Qdrant with its embedding."""
-    text = _build_search_text(
-        description or item.description or f"{item.name} {item.type_name}",
-        item.category,
-        item.dimensions,
-    )
-    vector = embed(text)
-
-    point = PointStruct(
-        id=abs(hash(item.item_code)) % (2**63),
-        vector=vector,
-        payload=item.model_dump(),
-    )
+    upsert_items([(item, description)])
+
+
+def upsert_items(entries: list[tuple[FurnitureItem, str | None]]):
+    """Store several (item, description) pairs with one embedding batch and one upsert."""
+    if not entries:
+        return
+    texts = [
+        _build_search_text(
+            description or item.description or f"{item.name} {item.type_name}",
+            item.category,
+            item.dimensions,
+        )
+        for item, description in entries
+    ]
+    vectors = _get_embedder().encode(texts).tolist()
+
+    points = [
+        PointStruct(
+            id=abs(hash(item.item_code)) % (2**63),
+            vector=vector,
+            payload=item.model_dump(),
+        )
+        for (item, _), vector in zip(entries, vectors)
+    ]
 
-    _get_qdrant().upsert(collection_name=COLLECTION, points=[point])
+    _get_qdrant().upsert(collection_name=COLLECTION, points=points)
@@ -0,0 +1,24 @@
+import pytest
+import uvloop
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-integration",
+        action="store_true",
+        help="run tests that hit the real IKEA API",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-integration"):
+        return
+    skip = pytest.mark.skip(reason="needs --run-integration")
+    for item in items:
+        if "integration" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_asyncio_loop_factories(config, item):
+    # Same loop the service runs on in production (uvicorn --loop uvloop)
+    return {"uvloop": uvloop.new_event_loop}
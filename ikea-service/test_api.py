@@ -1,20 +1,33 @@
 """Tests for the IKEA Furniture API.
 
 Unit tests use mocked IKEA API responses.
-Integration tests (marked with @pytest.mark.integration) hit the real IKEA API.
+Integration tests (marked with @pytest.mark.integration) hit the real IKEA API
+and only run with --run-integration.
 """
 
-from unittest.mock import AsyncMock, patch
+from types import MappingProxyType, SimpleNamespace
 
+import orjson
 import pytest
 from httpx import ASGITransport, AsyncClient
 
+from app import ikea_client
 from app.main import app
-from app.ikea_client import _extract_products, _parse_product
+from app.ikea_client import _extract_products, _models_cache, _parse_product, _search_cache
 
 # --- Sample data mimicking real IKEA search API responses ---
 
-SAMPLE_PRODUCT = {
+
+def _freeze(obj):
+    """Read-only deep view of sample data, so code under test can't mutate shared fixtures."""
+    if isinstance(obj, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return tuple(_freeze(v) for v in obj)
+    return obj
+
+
+SAMPLE_PRODUCT = _freeze({
     "id": "00263850",
     "itemNo": "00263850",
     "name": "BILLY",
@@ -52,9 +65,9 @@ SAMPLE_PRODUCT = {
             }
         ]
     },
-}
+})
 
-SAMPLE_SEARCH_RESPONSE = {
+SAMPLE_SEARCH_RESPONSE = _freeze({
     "searchResultPage": {
         "products": {
             "main": {
@@ -64,8 +77,9 @@ SAMPLE_SEARCH_RESPONSE = {
             }
         }
     }
-}
+})
 
+# Left mutable: /stock returns the raw payload, and Pydantic can't serialize mappingproxy
 SAMPLE_STOCK_RESPONSE = {
     "availabilities": [
         {
@@ -85,35 +99,37 @@ SAMPLE_STOCK_RESPONSE = {
 
 
 class TestParseProduct:
-    def test_basic_fields(self):
-        item = _parse_product(SAMPLE_PRODUCT)
-        assert item.item_code == "00263850"
-        assert item.name == "BILLY"
-        assert item.type_name == "Bookcase"
-        assert item.dimensions == "80x28x202 cm"
-        assert item.price == 55.0
-        assert item.currency == "GBP"
-        assert item.color == "white"
-        assert item.rating == 4.7
-        assert item.rating_count == 249
-
-    def test_urls(self):
-        item = _parse_product(SAMPLE_PRODUCT)
-        assert item.buy_url == "https://www.ikea.com/gb/en/p/billy-bookcase-white-00263850/"
-        assert item.image_url == "https://www.ikea.com/gb/en/images/products/billy-bookcase-white__s5.jpg"
-
-    def test_images(self):
-        item = _parse_product(SAMPLE_PRODUCT)
+    @pytest.fixture(scope="class")
+    @classmethod
+    def item(cls):
+        return _parse_product(SAMPLE_PRODUCT)
+
+    @pytest.mark.parametrize(
+        "field,expected",
+        [
+            ("item_code", "00263850"),
+            ("name", "BILLY"),
+            ("type_name", "Bookcase"),
+            ("dimensions", "80x28x202 cm"),
+            ("price", 55.0),
+            ("currency", "GBP"),
+            ("color", "white"),
+            ("rating", 4.7),
+            ("rating_count", 249),
+            ("category", "Bookcases"),
+            ("buy_url", "https://www.ikea.com/gb/en/p/billy-bookcase-white-00263850/"),
+            ("image_url", "https://www.ikea.com/gb/en/images/products/billy-bookcase-white__s5.jpg"),
+        ],
+    )
+    def test_fields(self, item, field, expected):
+        assert getattr(item, field) == expected
+
+    def test_images(self, item):
         assert len(item.images) == 1
         assert item.images[0].type == "MAIN_PRODUCT_IMAGE"
         assert item.images[0].alt == "BILLY Bookcase, white, 80x28x202 cm"
 
-    def test_category(self):
-        item = _parse_product(SAMPLE_PRODUCT)
-        assert item.category == "Bookcases"
-
-    def test_variants(self):
-        item = _parse_product(SAMPLE_PRODUCT)
+    def test_variants(self, item):
         assert len(item.variants) == 1
         v = item.variants[0]
         assert v.item_code == "40477340"
@@ -155,72 +171,113 @@ class TestExtractProducts:
 # --- API endpoint tests (mocked IKEA API) ---
 
 
+def _json(resp):
+    return orjson.loads(resp.content)
+
+
+@pytest.fixture(autouse=True)
+def clear_ikea_caches():
+    _search_cache.clear()
+    _models_cache.clear()
+
+
 @pytest.fixture
-def client():
+def mock_run(monkeypatch):
+    """Stub ikea_api.run_async to serve queued responses (queued exceptions are raised)."""
+    stub = SimpleNamespace(responses=[], calls=[])
+
+    async def fake_run_async(endpoint):
+        stub.calls.append(endpoint)
+        response = stub.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(ikea_client.ikea_api, "run_async", fake_run_async)
+    return stub
+
+
+@pytest.fixture(scope="session")
+async def client():
     transport = ASGITransport(app=app)
-    return AsyncClient(transport=transport, base_url="http://test")
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
 
 
-@pytest.mark.asyncio
 async def test_health(client):
     resp = await client.get("/health")
     assert resp.status_code == 200
-    assert resp.json() == {"status": "ok"}
+    assert _json(resp) == {"status": "ok"}
 
 
-@pytest.mark.asyncio
-@patch("app.ikea_client.ikea_api.run_async", new_callable=AsyncMock)
-async def test_search(mock_run, client):
-    mock_run.return_value = SAMPLE_SEARCH_RESPONSE
+async def test_search(client, mock_run):
+    mock_run.responses.append(SAMPLE_SEARCH_RESPONSE)
     resp = await client.get("/search", params={"query": "billy", "limit": 5})
     assert resp.status_code == 200
-    data = resp.json()
+    data = _json(resp)
     assert data["query"] == "billy"
     assert len(data["items"]) == 1
     assert data["items"][0]["item_code"] == "00263850"
     assert data["items"][0]["price"] == 55.0
 
 
-@pytest.mark.asyncio
-@patch("app.ikea_client.ikea_api.run_async", new_callable=AsyncMock)
-async def test_product_found(mock_run, client):
-    mock_run.return_value = SAMPLE_SEARCH_RESPONSE
+async def test_product_found(client, mock_run):
+    mock_run.responses.append(SAMPLE_SEARCH_RESPONSE)
     resp = await client.get("/product/00263850")
     assert resp.status_code == 200
-    data = resp.json()
+    data = _json(resp)
     assert data["item_code"] == "00263850"
     assert data["name"] == "BILLY"
     assert data["dimensions"] == "80x28x202 cm"
 
 
-@pytest.mark.asyncio
-@patch("app.ikea_client.ikea_api.run_async", new_callable=AsyncMock)
-async def test_product_not_found(mock_run, client):
-    mock_run.return_value = {"searchResultPage": {"products": {"main": {"items": []}}}}
+async def test_product_not_found(client, mock_run):
+    mock_run.responses.append({"searchResultPage": {"products": {"main": {"items": []}}}})
     resp = await client.get("/product/99999999")
     assert resp.status_code == 404
 
 
-@pytest.mark.asyncio
-@patch("app.ikea_client.ikea_api.run_async", new_callable=AsyncMock)
-async def test_stock(mock_run, client):
-    mock_run.return_value = SAMPLE_STOCK_RESPONSE
+async def test_stock(client, mock_run):
+    mock_run.responses.append(SAMPLE_STOCK_RESPONSE)
     resp = await client.get("/stock/00263850")
     assert resp.status_code == 200
-    data = resp.json()
+    data = _json(resp)
     assert data["item_code"] == "00263850"
     assert "availabilities" in data["available"]
 
 
-@pytest.mark.asyncio
-@patch("app.ikea_client.ikea_api.run_async", new_callable=AsyncMock)
-async def test_search_ikea_error(mock_run, client):
-    mock_run.side_effect = Exception("Connection refused")
+async def test_search_ikea_error(client, mock_run):
+    mock_run.responses.append(Exception("Connection refused"))
     resp = await client.get("/search", params={"query": "test"})
     assert resp.status_code == 502
 
 
-@pytest.mark.asyncio
+async def test_search_cached(client, mock_run):
+    mock_run.responses.append(SAMPLE_SEARCH_RESPONSE)
+    await client.get("/search", params={"query": "billy", "limit": 5})
+    resp = await client.get("/search", params={"query": "Billy ", "limit": 5})
+    assert resp.status_code == 200
+    assert _json(resp)["items"][0]["item_code"] == "00263850"
+    assert len(mock_run.calls) == 1
+
+
+async def test_search_cache_bounded(client, mock_run, monkeypatch):
+    monkeypatch.setattr(ikea_client, "SEARCH_CACHE_MAX", 2)
+    for query in ("a", "b", "c"):
+        mock_run.responses.append(SAMPLE_SEARCH_RESPONSE)
+        await client.get("/search", params={"query": query})
+    assert [q for q, _ in _search_cache] == ["b", "c"]
+
+
+async def test_search_gzip(client, mock_run):
+    items = [{"product": {**SAMPLE_PRODUCT, "id": str(i)}} for i in range(10)]
+    mock_run.responses.append({"searchResultPage": {"products": {"main": {"items": items}}}})
+    resp = await client.get("/search", params={"query": "billy"}, headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert len(_json(resp)["items"]) == 10
+
+
 async def test_search_limit_validation(client):
     resp = await client.get("/search", params={"query": "test", "limit": 0})
     assert resp.status_code == 422
@@ -229,16 +286,64 @@ async def test_search_limit_validation(client):
     assert resp.status_code == 422
 
 
+async def test_run_pipeline_keeps_order_and_isolates_failures(monkeypatch):
+    from app import pipeline
+    from app.models import FurnitureQuery, PipelineResult
+
+    async def fake_process(query, pending_upserts=None):
+        if query.description == "bad":
+            raise RuntimeError("IKEA down")
+        return PipelineResult(query=query, source="cache", item=None)
+
+    queries = [FurnitureQuery(description=d) for d in ("sofa", "bad", "lamp")]
+    monkeypatch.setattr(pipeline, "process_query", fake_process)
+    results = await pipeline.run_pipeline(queries)
+
+    assert [r.query.description for r in results] == ["sofa", "bad", "lamp"]
+    assert [r.source for r in results] == ["cache", "ikea_api", "cache"]
+    assert results[1].item is None
+
+
+async def test_process_query_cache_hit_skips_ikea(mock_run, monkeypatch):
+    from app import pipeline
+    from app.models import FurnitureItem, FurnitureQuery
+
+    cached = FurnitureItem(item_code="00263850")
+    monkeypatch.setattr(pipeline, "search_similar", lambda *args: cached)
+    result = await pipeline.process_query(FurnitureQuery(description="billy"))
+
+    assert result.source == "cache"
+    assert result.item is cached
+    assert mock_run.calls == []
+
+
+async def test_model_exists_caches_hits(monkeypatch):
+    from unittest.mock import MagicMock
+
+    from app import storage
+
+    for var, val in [("DO_SPACES_KEY", "k"), ("DO_SPACES_SECRET", "s"),
+                     ("DO_SPACES_REGION", "ams3"), ("DO_SPACES_BUCKET", "b")]:
+        monkeypatch.setenv(var, val)
+    s3 = MagicMock()
+    monkeypatch.setattr(storage, "_client", s3)
+    monkeypatch.setattr(storage, "_exists_cache", {})
+
+    url = "https://b.ams3.digitaloceanspaces.com/models/00263850.glb"
+    assert await storage.model_exists("00263850") == url
+    assert await storage.model_exists("00263850") == url
+    s3.head_object.assert_called_once()
+
+
 # --- Integration tests (hit real IKEA API) ---
-# Run with: pytest test_api.py -m integration
+# Run with: pytest test_api.py --run-integration -m integration
 
 
 @pytest.mark.integration
-@pytest.mark.asyncio
 async def test_live_search(client):
     resp = await client.get("/search", params={"query": "billy bookcase", "limit": 2})
     assert resp.status_code == 200
-    data = resp.json()
+    data = _json(resp)
     assert len(data["items"]) > 0
     item = data["items"][0]
     assert item["name"] is not None
@@ -247,18 +352,16 @@ async def test_live_search(client):
 
 
 @pytest.mark.integration
-@pytest.mark.asyncio
 async def test_live_product(client):
     resp = await client.get("/product/00263850")
     assert resp.status_code == 200
-    data = resp.json()
+    data = _json(resp)
     assert data["name"] == "BILLY"
     assert data["price"] is not None
 
 
 @pytest.mark.integration
-@pytest.mark.asyncio
 async def test_live_stock(client):
     resp = await client.get("/stock/00263850")
     assert resp.status_code == 200
-    assert "availabilities" in resp.json()["available"]
+    assert "availabilities" in _json(resp)["available"]